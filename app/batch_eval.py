@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+import orjson
+
+from app.chat_service import aprocess_message
+from app.intents import detect_intent
+from app.llm.vector_store import aembed_queries
+from app.metrics import start_timings
+
+logger = logging.getLogger(__name__)
+
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "8"))
+EVAL_MAX_CONCURRENCY = int(os.getenv("EVAL_MAX_CONCURRENCY", "32"))
+EVAL_MAX_ITEMS = int(os.getenv("EVAL_MAX_ITEMS", "2000"))
+
+
+class EvalInputError(ValueError):
+    """Raised for a batch that is empty, too large or not valid JSONL."""
+
+
+def parse_jsonl(data: bytes | str) -> list[dict]:
+    """Parse evaluation items: one JSON object per line with at least a
+    `message`, optionally `id`, `hotel_id`, `session_id` and the expected
+    `intent`."""
+    items = []
+    for number, line in enumerate(data.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise EvalInputError(f"Line {number}: invalid JSON ({e})") from None
+        if not isinstance(item, dict) or not str(item.get("message") or "").strip():
+            raise EvalInputError(f"Line {number}: expected an object with a message")
+        items.append(item)
+
+    if not items:
+        raise EvalInputError("No questions to evaluate")
+    if len(items) > EVAL_MAX_ITEMS:
+        raise EvalInputError(f"Too many questions ({len(items)} > {EVAL_MAX_ITEMS})")
+    return items
+
+
+async def run_batch(items: list[dict], concurrency: int = EVAL_CONCURRENCY, hotel_id: str | None = None):
+    """Answer every item through the chat pipeline, at most `concurrency`
+    at a time, yielding one result dict per item as it completes.
+
+    Each item gets its own session unless it names one, so answers don't
+    depend on the order they run in. Sessions are namespaced by run, so a
+    named one never touches a real guest's session, and ephemeral: nothing
+    is written to the chat history store, the answer cache is bypassed and
+    the production metrics don't count them, so results reflect the
+    current hotel data and prompt. Questions that reach the embedding path
+    are embedded up front in batched requests.
+    """
+    concurrency = max(1, min(concurrency, EVAL_MAX_CONCURRENCY))
+    run_id = uuid.uuid4().hex[:8]
+    start_timings(observe=False)
+
+    fallback = [item["message"].strip() for item in items if detect_intent(item["message"].strip()) == "fallback"]
+    if fallback:
+        started = time.perf_counter()
+        try:
+            embedded = await aembed_queries(fallback)
+            logger.info(f"Embedded {embedded} eval questions in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            # Each item embeds its own question instead
+            logger.warning(f"Batched eval embeddings failed: {e}")
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def answer(index: int, item: dict) -> dict:
+        async with sem:
+            result = {
+                "index": index,
+                "id": item.get("id"),
+                "message": item["message"],
+                "hotel_id": item.get("hotel_id", hotel_id),
+                "expected_intent": item.get("intent"),
+            }
+            timings = start_timings(observe=False)
+            started = time.perf_counter()
+            try:
+                reply, intent, _ = await aprocess_message(
+                    item["message"].strip(),
+                    f"eval-{run_id}-{item.get('session_id') or index}",
+                    incremental=True,
+                    hotel_id=result["hotel_id"],
+                    ephemeral=True,
+                )
+                result.update(reply=reply, intent=intent, error=None)
+            except Exception as e:
+                logger.error(f"Eval item {index} failed: {e}")
+                result.update(reply=None, intent=None, error=str(e))
+            result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            result["timings"] = {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+            if result["expected_intent"] is not None:
+                result["intent_match"] = result["intent"] == result["expected_intent"]
+            return result
+
+    tasks = [asyncio.create_task(answer(i, item)) for i, item in enumerate(items)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # The consumer went away (e.g. the client disconnected)
+        for task in tasks:
+            task.cancel()
+
+
+def summarize(results: list[dict]) -> dict:
+    latencies = sorted(r["ms"] for r in results)
+    labelled = [r for r in results if "intent_match" in r]
+    return {
+        "items": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "intent_accuracy": round(sum(r["intent_match"] for r in labelled) / len(labelled), 4) if labelled else None,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        "max_ms": latencies[-1] if latencies else None,
+    }
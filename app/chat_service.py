@@ -1,36 +1,196 @@
+import asyncio
+import time
 from app.intents import detect_intent
-from app import responses
+from app.hotel_snapshot import get_hotel_snapshot
 from app.llm.chat_history import add_message, get_history
-from app.llm.llm_service import llm_fallback_answer
+from app.llm.conversation_summary import conversation_summaries
+from app.llm.history_cache import HISTORY_CACHE_WINDOW, history_cache
+from app.llm.llm_service import llm_fallback_answer, allm_fallback_answer, astream_fallback_answer, is_standalone
+from app.llm.vector_store import aembed_query, aretrieve_relevant_context
+from app.llm.answer_cache import answer_cache
+from app.llm.intent_router import intent_router
+from app.metrics import INTENTS, count, record_stage, stage, timed
 
 
-def process_message(message: str, session_id: str):
-    add_message(session_id, "user", message)
+def _canned_reply(intent: str, hotel_id: str | None = None) -> str:
+    rendered = get_hotel_snapshot(hotel_id).responses
+    return rendered.get(intent, rendered["fallback"])
 
-    history = get_history(session_id) or []
 
-    intent = detect_intent(message)
+def process_message(message: str, session_id: str, hotel_id: str | None = None):
+    hotel_id = get_hotel_snapshot(hotel_id).hotel_id
 
-    match intent:
-        case "greeting":
-            reply = responses.greeting_response()
-        case "horarios":
-            reply = responses.horarios_response()
-        case "servicios":
-            reply = responses.servicios_response()
-        case "habitaciones":
-            reply = responses.habitaciones_response()
-        case "recomendaciones":
-            reply = responses.recomendaciones_response()
-        case "humano":
-            reply = responses.humano_response()
-        case "fallback":
-            reply = llm_fallback_answer(message, history)
-        case _:
-            reply = responses.fallback_response()
+    with stage("history_write"):
+        add_message(session_id, "user", message)
 
-    add_message(session_id, "bot", reply)
+    with stage("intent"):
+        intent = detect_intent(message)
 
-    history = get_history(session_id) or []
+    if intent == "fallback":
+        # The running summary stands in for the messages it covers
+        with stage("history_read"):
+            rows = get_history(session_id, limit=conversation_summaries.context_messages) or []
+            summary, history = conversation_summaries.select(session_id, rows)
+        # Includes retrieval, which the sync path does inside the LLM call
+        with stage("llm"):
+            reply = llm_fallback_answer(message, history, hotel_id, summary)
+        count(INTENTS, intent, "llm")
+    else:
+        reply = _canned_reply(intent, hotel_id)
+        count(INTENTS, intent, "keyword")
+
+    with stage("history_write"):
+        add_message(session_id, "bot", reply)
+
+    with stage("history_read"):
+        history = get_history(session_id, limit=HISTORY_CACHE_WINDOW) or []
+
+    return reply, intent, history
+
+
+async def aprocess_message(
+    message: str,
+    session_id: str,
+    incremental: bool = False,
+    after: str | None = None,
+    hotel_id: str | None = None,
+    ephemeral: bool = False
+):
+    """Answer a message in a session.
+
+    With `ephemeral` (evaluation runs) the messages are kept out of the
+    chat history store and the answer cache is neither read nor filled, so
+    every reply reflects the current pipeline, and the session is never
+    summarized.
+    """
+    # Resolved up front so an unknown hotel fails before anything is stored
+    hotel_id = get_hotel_snapshot(hotel_id).hotel_id
+
+    if ephemeral:
+        # Unpersisted messages only live in the cached window, so load it first
+        with stage("history_read"):
+            await history_cache.get(session_id, limit=1)
+
+    with stage("history_write"):
+        user_row = await history_cache.append(session_id, "user", message, persist=not ephemeral)
+
+    with stage("intent"):
+        intent = detect_intent(message)
+
+    source = "keyword"
+    if intent == "fallback":
+        started = time.perf_counter()
+        # History comes from the cache, so the embedding is the only round-trip to wait on
+        (summary, history), query_embedding = await asyncio.gather(
+            timed("history_read", conversation_summaries.context(session_id)),
+            timed("embed", aembed_query(message)),
+        )
+        with stage("route"):
+            routed = intent_router.route(query_embedding)
+        # Answers to follow-ups depend on the conversation, so only
+        # standalone questions share cached answers
+        cacheable = is_standalone(history, summary) and not ephemeral
+        if routed is not None:
+            intent, source = routed, "router"
+            reply = _canned_reply(intent, hotel_id)
+        else:
+            reply = None
+            if cacheable:
+                with stage("answer_cache"):
+                    reply = await answer_cache.lookup(query_embedding, hotel_id)
+                source = "answer_cache"
+            if reply is None:
+                source = "llm"
+                with stage("retrieve"):
+                    knowledge = await aretrieve_relevant_context(
+                        message, query_embedding=query_embedding, hotel_id=hotel_id
+                    )
+                with stage("llm"):
+                    reply = await allm_fallback_answer(message, history, knowledge, hotel_id, summary)
+                if cacheable:
+                    answer_cache.store(query_embedding, reply, time.perf_counter() - started, hotel_id)
+    else:
+        reply = _canned_reply(intent, hotel_id)
+    count(INTENTS, intent, source)
+
+    with stage("history_write"):
+        bot_row = await history_cache.append(session_id, "bot", reply, persist=not ephemeral)
+    if not ephemeral:
+        conversation_summaries.schedule(session_id)
+
+    with stage("history_read"):
+        if not incremental:
+            history = await history_cache.get(session_id)
+        elif after is not None:
+            history = await history_cache.get(session_id, after=after)
+        else:
+            history = [user_row, bot_row]
 
     return reply, intent, history
+
+
+async def astream_message(message: str, session_id: str, hotel_id: str | None = None):
+    """Process a message as a stream of `(event, data)` pairs.
+
+    The bot reply is only stored in the history once the stream completes.
+    """
+    hotel_id = get_hotel_snapshot(hotel_id).hotel_id
+
+    with stage("history_write"):
+        await history_cache.append(session_id, "user", message)
+
+    with stage("intent"):
+        intent = detect_intent(message)
+
+    if intent != "fallback":
+        reply = _canned_reply(intent, hotel_id)
+        count(INTENTS, intent, "keyword")
+        bot_row = await history_cache.append(session_id, "bot", reply)
+        conversation_summaries.schedule(session_id)
+        yield "message", {"reply": reply, "intent": intent, "cursor": bot_row["created_at"]}
+        return
+
+    started = time.perf_counter()
+    (summary, history), query_embedding = await asyncio.gather(
+        timed("history_read", conversation_summaries.context(session_id)),
+        timed("embed", aembed_query(message)),
+    )
+
+    with stage("route"):
+        routed = intent_router.route(query_embedding)
+    cacheable = is_standalone(history, summary)
+    reply = None
+    if routed is not None:
+        intent, source = routed, "router"
+        reply = _canned_reply(intent, hotel_id)
+    elif cacheable:
+        with stage("answer_cache"):
+            reply = await answer_cache.lookup(query_embedding, hotel_id)
+        source = "answer_cache"
+
+    if reply is not None:
+        count(INTENTS, intent, source)
+        bot_row = await history_cache.append(session_id, "bot", reply)
+        conversation_summaries.schedule(session_id)
+        yield "message", {"reply": reply, "intent": intent, "cursor": bot_row["created_at"]}
+        return
+
+    with stage("retrieve"):
+        knowledge = await aretrieve_relevant_context(message, query_embedding=query_embedding, hotel_id=hotel_id)
+
+    parts = []
+    llm_started = time.perf_counter()
+    async for text in astream_fallback_answer(message, history, knowledge, hotel_id, summary):
+        parts.append(text)
+        yield "token", {"text": text}
+    # Includes the time the client takes to read the tokens; the
+    # generator is suspended at each yield until then
+    record_stage("llm", time.perf_counter() - llm_started)
+
+    reply = "".join(parts)
+    if cacheable:
+        answer_cache.store(query_embedding, reply, time.perf_counter() - started, hotel_id)
+    count(INTENTS, intent, "llm")
+    bot_row = await history_cache.append(session_id, "bot", reply)
+    conversation_summaries.schedule(session_id)
+    yield "done", {"reply": reply, "intent": intent, "cursor": bot_row["created_at"]}
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import httpx
+from tenacity import retry, retry_if_exception, stop_after_attempt, stop_after_delay, wait_random_exponential
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+# Total time a call may spend retrying, so a slow upstream can't hold a worker
+UPSTREAM_RETRY_BUDGET = float(os.getenv("UPSTREAM_RETRY_BUDGET", "20"))
+
+HTTP_TIMEOUT = httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, httpx.TransportError):
+        return True
+    # The openai package is imported lazily; if it isn't loaded, this can't be one of its errors
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+# Bounded, jittered retries for calls to Supabase and OpenAI. Client-side
+# SDK retries are disabled so this is the only retry layer.
+upstream_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    stop=stop_after_attempt(UPSTREAM_MAX_ATTEMPTS) | stop_after_delay(UPSTREAM_RETRY_BUDGET),
+    wait=wait_random_exponential(multiplier=0.2, max=2),
+    reraise=True,
+)
+
+
+class ConnectionStats:
+    """Counts requests and newly opened TCP connections via httpcore tracing."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+
+    def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def aon_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._atrace
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def _atrace(self, event_name: str, info: dict):
+        self._trace(event_name, info)
+
+    def stats(self) -> dict:
+        reused = self.requests - self.connections_opened
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+_stats = {"sync": ConnectionStats(), "async": ConnectionStats()}
+_sync_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Shared pooled sync client (keep-alive, HTTP/2) for every upstream."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            limits=_limits(),
+            follow_redirects=True,
+            event_hooks={"request": [_stats["sync"].on_request]},
+        )
+    return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared pooled async client (keep-alive, HTTP/2) for every upstream."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            limits=_limits(),
+            follow_redirects=True,
+            event_hooks={"request": [_stats["async"].aon_request]},
+        )
+    return _async_client
+
+
+async def aclose_http_clients():
+    if _async_client is not None:
+        await _async_client.aclose()
+    if _sync_client is not None:
+        _sync_client.close()
+
+
+def http_stats() -> dict:
+    return {name: s.stats() for name, s in _stats.items()}
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from limits.storage import Storage
+
+# Where state shared by all workers lives: "sqlite:///<path>" (default, one
+# file shared by the workers on this machine), "redis://host:port/db" (needs
+# the redis package) or "memory://" (per process, for a single worker).
+SHARED_STATE_URL = os.getenv(
+    "SHARED_STATE_URL",
+    f"sqlite:///{Path(tempfile.gettempdir()) / 'hotel_chatbot_state.sqlite3'}"
+)
+MEMORY_STORE_SIZE = int(os.getenv("MEMORY_STORE_SIZE", "10000"))
+
+
+class MemoryStore:
+    """Process-local key/value store with per-key expiry and LRU eviction."""
+
+    def __init__(self, maxsize: int = MEMORY_STORE_SIZE):
+        self._maxsize = maxsize
+        self._data: OrderedDict[str, tuple[bytes | int, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._live(key)
+            return None if item is None else item[0]
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Add `amount` to a counter; `ttl` only applies when it is created."""
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                item = (0, time.time() + ttl if ttl else None)
+            self._data[key] = (int(item[0]) + amount, item[1])
+            return self._data[key][0]
+
+    def expires_at(self, key: str) -> float | None:
+        with self._lock:
+            item = self._live(key)
+            return None if item is None else item[1]
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteStore:
+    """Key/value store in one SQLite file, shared by every process on the host.
+
+    WAL mode lets readers run alongside a writer; each thread gets its own
+    connection. Expired rows are ignored on read and purged on write now and
+    then.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _wrote(self, conn: sqlite3.Connection):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> bytes | None:
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+        self._wrote(conn)
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Add `amount` to a counter; `ttl` only applies when it is created."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+            conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, amount, now + ttl if ttl else None)
+            )
+            value = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._wrote(conn)
+        return int(value)
+
+    def expires_at(self, key: str) -> float | None:
+        row = self._connect().execute("SELECT expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def delete_prefix(self, prefix: str):
+        self._connect().execute("DELETE FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+class RedisStore:
+    """The same interface on top of Redis (or a compatible server)."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_STATE_URL points to Redis but the redis package is not installed") from e
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> bytes | None:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        self._redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self._redis.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: float | None = None) -> int:
+        """Add `amount` to a counter; `ttl` only applies when it is created."""
+        pipe = self._redis.pipeline()
+        pipe.incrby(key, amount)
+        if ttl:
+            pipe.expire(key, int(ttl), nx=True)
+        return int(pipe.execute()[0])
+
+    def expires_at(self, key: str) -> float | None:
+        ms = self._redis.pttl(key)
+        return None if ms < 0 else time.time() + ms / 1000
+
+    def delete_prefix(self, prefix: str):
+        for key in self._redis.scan_iter(match=f"{prefix}*"):
+            self._redis.delete(key)
+
+
+def create_store(url: str):
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    if url.startswith("memory://"):
+        return MemoryStore()
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """Return the store behind SHARED_STATE_URL, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store(SHARED_STATE_URL)
+    return _store
+
+
+async def offload(store, func, *args):
+    """Call `func(*args)`, which uses `store`, from async code.
+
+    SQLite and Redis calls block, so they run in a thread to keep the event
+    loop serving other requests; a MemoryStore is called directly.
+    """
+    if isinstance(store, MemoryStore):
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+class SharedLimiterStorage(Storage):
+    """`limits` storage over the shared store, so every worker counts the
+    same rate-limit windows (`Limiter(storage_uri="sqlite:///...")`)."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._store = get_shared_store() if uri == SHARED_STATE_URL else create_store(uri)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self._store.incr(f"limit:{key}", amount, ttl=expiry)
+
+    def get(self, key: str) -> int:
+        value = self._store.get(f"limit:{key}")
+        return int(value) if value is not None else 0
+
+    def get_expiry(self, key: str) -> float:
+        return self._store.expires_at(f"limit:{key}") or time.time()
+
+    def check(self) -> bool:
+        try:
+            self._store.get("limit:__check__")
+            return True
+        except Exception:
+            return False
+
+    def reset(self) -> int | None:
+        self._store.delete_prefix("limit:")
+        return None
+
+    def clear(self, key: str) -> None:
+        self._store.delete(f"limit:{key}")
@@ -1,13 +1,54 @@
 import os
-from supabase import create_client
+import asyncio
+import threading
 from dotenv import load_dotenv
+from app.core.config.http_clients import get_http_client, get_async_http_client
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if SUPABASE_URL is None or SUPABASE_KEY is None:
-	raise RuntimeError("Environment variables SUPABASE_URL and SUPABASE_KEY must be set")
+# The supabase package is slow to import and most turns never touch it, so
+# both clients are created on first use (or by the startup warm-up).
+_supabase = None
+_sync_lock = threading.Lock()
+_async_supabase = None
+_async_lock = asyncio.Lock()
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def _check_env():
+	if SUPABASE_URL is None or SUPABASE_KEY is None:
+		raise RuntimeError("Environment variables SUPABASE_URL and SUPABASE_KEY must be set")
+
+
+def get_supabase():
+	"""Return the shared sync Supabase client, creating it on first use."""
+	global _supabase
+	if _supabase is None:
+		with _sync_lock:
+			if _supabase is None:
+				_check_env()
+				from supabase import create_client, ClientOptions
+				_supabase = create_client(
+					SUPABASE_URL,
+					SUPABASE_KEY,
+					options=ClientOptions(httpx_client=get_http_client())
+				)
+	return _supabase
+
+
+async def get_async_supabase():
+	"""Return the shared async Supabase client, creating it on first use."""
+	global _async_supabase
+	if _async_supabase is None:
+		async with _async_lock:
+			if _async_supabase is None:
+				_check_env()
+				from supabase import acreate_client, AsyncClientOptions
+				_async_supabase = await acreate_client(
+					SUPABASE_URL,
+					SUPABASE_KEY,
+					options=AsyncClientOptions(httpx_client=get_async_http_client())
+				)
+	return _async_supabase
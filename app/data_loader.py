@@ -1,10 +1,41 @@
 import json
+import os
+import re
 from pathlib import Path
 
 DATA_PATH = Path(__file__).parent / 'data' / 'hotel_info.json'
+# Other properties live in HOTELS_DIR/<hotel_id>.json; DEFAULT_HOTEL_ID is DATA_PATH
+HOTELS_DIR = Path(os.getenv("HOTELS_DIR", str(Path(__file__).parent / 'data' / 'hotels')))
+DEFAULT_HOTEL_ID = os.getenv("DEFAULT_HOTEL_ID", "costa-azul")
 
-def load_hotel_info() -> dict:
+_HOTEL_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class UnknownHotelError(LookupError):
+    """Raised for a hotel id that is malformed or has no data file."""
+
+
+def resolve_hotel_id(hotel_id: str | None) -> str:
+    return DEFAULT_HOTEL_ID if hotel_id is None else hotel_id
+
+
+def hotel_info_path(hotel_id: str | None = None) -> Path:
+    hotel_id = resolve_hotel_id(hotel_id)
+    if hotel_id == DEFAULT_HOTEL_ID:
+        return DATA_PATH
+    if not _HOTEL_ID_RE.match(hotel_id):
+        raise UnknownHotelError(hotel_id)
+    return HOTELS_DIR / f"{hotel_id}.json"
+
+
+def load_hotel_info(hotel_id: str | None = None) -> dict:
     """Load hotel information from a JSON file."""
-    with open(DATA_PATH, 'r', encoding='utf-8') as file:
-        hotel_info = json.load(file)
-    return hotel_info
\ No newline at end of file
+    path = hotel_info_path(hotel_id)
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            hotel_info = json.load(file)
+    except FileNotFoundError:
+        if hotel_id is None or hotel_id == DEFAULT_HOTEL_ID:
+            raise
+        raise UnknownHotelError(hotel_id) from None
+    return hotel_info
@@ -1,7 +1,8 @@
 from app.data_loader import load_hotel_info
 
-def build_hotel_context() -> str:
-    info = load_hotel_info()
+def build_hotel_context(info: dict | None = None) -> str:
+    if info is None:
+        info = load_hotel_info()
 
     lines = []
 
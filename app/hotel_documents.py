@@ -0,0 +1,70 @@
+def build_documents(info: dict) -> list:
+    docs = [
+        f"Wifi del hotel: {info['hotel']['wifi']}",
+        f"Parking: {info['hotel']['parking']}",
+        f"Check-in: {info['hotel']['checkin']}",
+        f"Check-out: {info['hotel']['checkout']}",
+    ]
+
+    for s in info.get("services", []):
+        docs.append(f"Servicio del hotel: {s}")
+
+    for r in info.get("rooms", []):
+        docs.append(f"Habitación {r['type']} para {r['capacity']} personas")
+
+    for a in info.get("general_activities", {}).get("rainy_day", []):
+        docs.append(f"Actividad en día de lluvia: {a}")
+
+    for a in info.get("general_activities", {}).get("with_kids", []):
+        docs.append(f"Actividad para niños: {a}")
+
+    if "address" in info:
+        addr = info["address"]
+        docs.append(f"Dirección: {addr.get('street', '')}, {addr.get('city', '')} {addr.get('postal_code', '')}, {addr.get('country', '')}")
+        docs.append(f"Coordenadas: lat {addr.get('lat')}, lng {addr.get('lng')}")
+
+    if "photos" in info:
+        for p in info["photos"]:
+            docs.append(f"Foto del hotel: {p}")
+
+    if "rating" in info:
+        docs.append(f"Valoración media: {info['rating'].get('average')}")
+        for rev in info['rating'].get('reviews', []):
+            docs.append(f"Reseña: {rev.get('user')} puntuación {rev.get('score')}: {rev.get('text')}")
+
+    if "policies" in info:
+        for k, v in info['policies'].items():
+            docs.append(f"Política {k}: {v}")
+
+    if "faqs" in info:
+        for f in info['faqs']:
+            docs.append(f"FAQ: {f.get('q')} - {f.get('a')}")
+
+    if "hours" in info:
+        for k, v in info['hours'].items():
+            docs.append(f"Horario {k}: {v}")
+
+    if "payment_methods" in info:
+        docs.append("Métodos de pago: " + ", ".join(info["payment_methods"]))
+
+    if "amenities" in info:
+        for a in info['amenities']:
+            docs.append(f"Amenidad: {a.get('name')} - {a.get('description', '')}")
+
+    if "accessibility" in info:
+        acc = info['accessibility']
+        acc_items = [k for k, v in acc.items() if v]
+        docs.append("Accesibilidad: " + ", ".join(acc_items))
+
+    if "transport" in info:
+        for k, v in info['transport'].items():
+            docs.append(f"Transporte {k}: {v}")
+
+    if "languages_spoken" in info:
+        docs.append("Idiomas hablados: " + ", ".join(info['languages_spoken']))
+
+    if "special_offers" in info:
+        for s in info['special_offers']:
+            docs.append(f"Oferta: {s.get('title')} - {s.get('description')} (validez: {s.get('valid_until')})")
+
+    return docs
@@ -0,0 +1,213 @@
+import hashlib
+import orjson
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from app import responses
+from app.data_loader import DEFAULT_HOTEL_ID, UnknownHotelError, hotel_info_path, load_hotel_info, resolve_hotel_id
+from app.hotel_context import build_hotel_context
+from app.hotel_documents import build_documents
+from app.llm.answer_cache import answer_cache
+from app.llm.lexical_index import BM25Index
+from app.llm.local_index import RETRIEVAL_BACKEND, LocalVectorIndex, local_index_path
+from app.llm.prompt_builder import render_system_prompt
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) the hot path may stat a hotel's files for changes
+HOTEL_INFO_CHECK_INTERVAL = float(os.getenv("HOTEL_INFO_CHECK_INTERVAL", "5"))
+# Approximate memory the loaded hotels may use before idle ones are evicted
+HOTEL_MEMORY_BUDGET_MB = float(os.getenv("HOTEL_MEMORY_BUDGET_MB", "256"))
+
+
+class HotelSnapshot(NamedTuple):
+    """Everything derived from one hotel's hotel_info.json, rendered once per file version."""
+    hotel_id: str
+    info: dict
+    # mtimes of the files it was built from, see _file_versions
+    versions: tuple
+    json_bytes: bytes
+    etag: str
+    context: str
+    responses: dict
+    system_prompt: str
+    lexical_index: BM25Index
+    # Only loaded with RETRIEVAL_BACKEND=local
+    vector_index: LocalVectorIndex | None
+    size: int
+
+
+def _load_vector_index(hotel_id: str) -> LocalVectorIndex | None:
+    if RETRIEVAL_BACKEND != "local":
+        return None
+    try:
+        return LocalVectorIndex.load(local_index_path(hotel_id))
+    except FileNotFoundError:
+        logger.warning(f"No local vector index for hotel {hotel_id}, run `python cli.py reindex --local --hotel {hotel_id}`")
+        return LocalVectorIndex(np.zeros((0, 0), dtype=np.float32), [])
+
+
+def _file_versions(hotel_id: str) -> tuple:
+    """mtimes of the hotel's info file and, with the local backend, of its
+    vector index files (None while missing).
+
+    A reindex in any worker replaces the index files, so comparing these
+    lets every worker notice it, not only the one that ran the job.
+    """
+    paths = [hotel_info_path(hotel_id)]
+    if RETRIEVAL_BACKEND == "local":
+        prefix = local_index_path(hotel_id)
+        paths += [prefix.with_suffix(".npy"), prefix.with_suffix(".json")]
+
+    versions = []
+    for path in paths:
+        try:
+            versions.append(os.stat(path).st_mtime)
+        except FileNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+
+def build_snapshot(hotel_id: str | None = None) -> HotelSnapshot:
+    hotel_id = resolve_hotel_id(hotel_id)
+    # Taken before loading, so a file replaced meanwhile is picked up on the next check
+    versions = _file_versions(hotel_id)
+    if versions[0] is None:
+        if hotel_id == DEFAULT_HOTEL_ID:
+            raise FileNotFoundError(hotel_info_path(hotel_id))
+        raise UnknownHotelError(hotel_id)
+    info = load_hotel_info(hotel_id)
+    json_bytes = orjson.dumps(info)
+    documents = build_documents(info)
+    vector_index = _load_vector_index(hotel_id)
+    # Rough footprint: the parsed info and its renderings are a small
+    # multiple of the JSON, the inverted index of its documents
+    size = 4 * len(json_bytes) + 3 * sum(len(d) for d in documents)
+    if vector_index is not None:
+        size += vector_index.vectors.nbytes
+    return HotelSnapshot(
+        hotel_id=hotel_id,
+        info=info,
+        versions=versions,
+        json_bytes=json_bytes,
+        etag=f'"{hashlib.sha256(json_bytes).hexdigest()[:32]}"',
+        context=build_hotel_context(info),
+        responses=responses.render_responses(info),
+        system_prompt=render_system_prompt(info),
+        lexical_index=BM25Index(documents),
+        vector_index=vector_index,
+        size=size,
+    )
+
+
+class HotelRegistry:
+    """Per-hotel snapshots, loaded on first use and kept in LRU order.
+
+    Once the loaded hotels exceed `budget_bytes`, the least recently used
+    ones are evicted (never the one just requested) and rebuilt from disk
+    if they are asked for again.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self._budget = budget_bytes
+        self._snapshots: OrderedDict[str, HotelSnapshot] = OrderedDict()
+        self._checked_at: dict[str, float] = {}
+        # Kept after eviction, to tell a changed file from a reload
+        self._versions: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, hotel_id: str | None = None) -> HotelSnapshot:
+        hotel_id = resolve_hotel_id(hotel_id)
+        snapshot = self._snapshots.get(hotel_id)
+        if snapshot is None:
+            return self.reload(hotel_id)
+
+        now = time.monotonic()
+        if now - self._checked_at.get(hotel_id, 0.0) >= HOTEL_INFO_CHECK_INTERVAL:
+            self._checked_at[hotel_id] = now
+            try:
+                changed = _file_versions(hotel_id) != snapshot.versions
+            except OSError:
+                changed = False
+            if changed:
+                return self.reload(hotel_id)
+
+        try:
+            self._snapshots.move_to_end(hotel_id)
+        except KeyError:
+            # Evicted meanwhile; this request still uses the snapshot it got
+            pass
+        return snapshot
+
+    def reload(self, hotel_id: str | None = None) -> HotelSnapshot:
+        """Rebuild a hotel's snapshot from disk and swap it in.
+
+        If the file cannot be loaded (e.g. half-written JSON) the current
+        snapshot is kept. When its files changed, this worker's cached
+        answers for the hotel are dropped, since they may be built from the
+        replaced data.
+        """
+        hotel_id = resolve_hotel_id(hotel_id)
+        try:
+            snapshot = build_snapshot(hotel_id)
+        except Exception as e:
+            snapshot = self._snapshots.get(hotel_id)
+            if snapshot is None:
+                raise
+            logger.error(f"Failed to reload hotel info for {hotel_id}, keeping previous snapshot: {e}")
+            return snapshot
+
+        with self._lock:
+            previous = self._versions.get(hotel_id)
+            if previous is not None and previous != snapshot.versions:
+                answer_cache.expire_hotel(hotel_id)
+            self._versions[hotel_id] = snapshot.versions
+            self.loads += 1
+            self._snapshots[hotel_id] = snapshot
+            self._snapshots.move_to_end(hotel_id)
+            self._checked_at[hotel_id] = time.monotonic()
+            self._evict(keep=hotel_id)
+            return snapshot
+
+    def _evict(self, keep: str):
+        total = sum(s.size for s in self._snapshots.values())
+        for hotel_id in list(self._snapshots):
+            if total <= self._budget:
+                break
+            if hotel_id == keep:
+                continue
+            total -= self._snapshots.pop(hotel_id).size
+            self._checked_at.pop(hotel_id, None)
+            self.evictions += 1
+            logger.info(f"Evicted hotel {hotel_id} from memory")
+
+    def loaded(self) -> list[str]:
+        return list(self._snapshots)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": len(self._snapshots),
+            "bytes": sum(s.size for s in self._snapshots.values()),
+            "budget_bytes": self._budget,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+hotels = HotelRegistry(budget_bytes=int(HOTEL_MEMORY_BUDGET_MB * 1024 * 1024))
+
+
+def get_hotel_snapshot(hotel_id: str | None = None) -> HotelSnapshot:
+    return hotels.get(hotel_id)
+
+
+def reload_hotel_snapshot(hotel_id: str | None = None) -> HotelSnapshot:
+    return hotels.reload(hotel_id)
@@ -1,29 +1,87 @@
-def detect_intent(message: str) -> str:
-    msg = message.lower()
+import os
+import re
+from typing import NamedTuple
+
+from app.utils.text_utils import normalize_text
+
+# Keyword/phrase tables, matched as whole words on accent-folded lowercase
+# text. Order is the tie-break priority.
+INTENT_KEYWORDS = {
+    "greeting": [
+        "hola", "buenas", "buenos dias", "buenas tardes", "buenas noches",
+        "hello", "hi", "hey", "saludos",
+    ],
+    "horarios": [
+        "check-in", "check in", "checkin", "check-out", "check out", "checkout",
+        "horario", "horarios", "a que hora", "hora de entrada", "hora de salida",
+        "desayuno", "desayunos",
+    ],
+    "servicios": [
+        "wifi", "wi-fi", "internet", "parking", "aparcamiento", "aparcar",
+        "piscina", "spa", "gimnasio", "gym", "servicio", "servicios", "instalaciones",
+    ],
+    "habitaciones": [
+        "habitacion", "habitaciones", "suite", "suites", "precio", "precios",
+        "tarifa", "tarifas",
+    ],
+    "recomendaciones": [
+        "recomienda", "recomiendas", "recomiendan", "recomendacion", "recomendaciones",
+        "donde comer", "cenar", "restaurante", "restaurantes", "que visitar", "que ver",
+    ],
+    "humano": [
+        "recepcion", "recepcionista", "persona", "humano", "hablar con alguien",
+        "agente", "telefono", "contacto",
+    ],
+}
+
+# Small talk only decides the intent when nothing else matched
+WEAK_INTENTS = {"greeting"}
+
+INTENT_MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "1"))
+# Share of the total score the winning intent needs; 0.5 lets a two-way tie
+# resolve by table priority while three-way ties go to the LLM
+INTENT_MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.5"))
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+    scores: dict
 
-    if any(w in msg for w in ["hola", "buenas", "hello"]):
-        return "greeting"
 
-    if any(w in msg for w in ["check-in", "checkout", "horario", "desayuno"]):
-        return "horarios"
+def _compile(tables: dict) -> tuple[re.Pattern, dict]:
+    phrase_intent = {}
+    for intent, phrases in tables.items():
+        for phrase in phrases:
+            phrase_intent.setdefault(normalize_text(phrase), intent)
 
-    if any(w in msg for w in ["wifi", "parking", "piscina", "spa", "gimnasio"]):
-        return "servicios"
+    # Longest first so "check in" wins over a shorter overlapping phrase
+    alternation = "|".join(re.escape(p) for p in sorted(phrase_intent, key=len, reverse=True))
+    pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+    return pattern, phrase_intent
 
-    if any(w in msg for w in ["habitacion", "habitaciones", "suite", "precio"]):
-        return "habitaciones"
 
-    if any(w in msg for w in [
-        "recomienda",
-        "recomendación",
-        "recomendaciones",
-        "dónde comer",
-        "cenar",
-        "restaurante"
-    ]):
-        return "recomendaciones"
+_PATTERN, _PHRASE_INTENT = _compile(INTENT_KEYWORDS)
+_PRIORITY = {intent: i for i, intent in enumerate(INTENT_KEYWORDS)}
 
-    if any(w in msg for w in ["recepcion", "persona", "humano"]):
-        return "humano"
 
-    return "fallback"
+def classify_intent(message: str) -> IntentMatch:
+    scores: dict[str, float] = {}
+    for match in _PATTERN.finditer(normalize_text(message)):
+        intent = _PHRASE_INTENT[match.group(0)]
+        scores[intent] = scores.get(intent, 0.0) + 1.0
+
+    if not scores:
+        return IntentMatch("fallback", 0.0, scores)
+
+    ranked = {i: s for i, s in scores.items() if i not in WEAK_INTENTS} or scores
+    intent = min(ranked, key=lambda i: (-ranked[i], _PRIORITY[i]))
+    confidence = ranked[intent] / sum(ranked.values())
+
+    if ranked[intent] < INTENT_MIN_SCORE or confidence < INTENT_MIN_CONFIDENCE:
+        return IntentMatch("fallback", confidence, scores)
+    return IntentMatch(intent, confidence, scores)
+
+
+def detect_intent(message: str) -> str:
+    return classify_intent(message).intent
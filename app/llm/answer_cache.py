@@ -0,0 +1,153 @@
+import os
+import time
+
+import numpy as np
+
+from app.core.config.shared_state import SHARED_STATE_URL, get_shared_store, offload
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+GENERATION_KEY = "answer_cache:generation"
+
+
+class SemanticAnswerCache:
+    """LLM fallback answers keyed by query embedding similarity.
+
+    Embeddings are stored L2-normalized in a preallocated float32 matrix, so a
+    lookup is a single matrix-vector product. When full, the least recently
+    used slot is overwritten. Entries only answer lookups for the hotel
+    they were stored for. `clear()` must be called whenever the knowledge
+    base changes. With `shared`, it bumps a generation counter in the
+    cross-worker store and every worker drops its entries on its next
+    lookup; `ttl` bounds staleness if the store is unavailable.
+    """
+
+    def __init__(self, size: int, threshold: float, ttl: float, shared: bool = False):
+        self._size = size
+        self._threshold = threshold
+        self._ttl = ttl
+        self._vectors: np.ndarray | None = None
+        self._answers: list[str | None] = [None] * size
+        self._hotel_ids = np.empty(size, dtype=object)
+        self._costs = np.zeros(size, dtype=np.float64)
+        self._stored_at = np.zeros(size, dtype=np.float64)
+        self._used_at = np.zeros(size, dtype=np.float64)
+        self._count = 0
+        self._shared = shared
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    async def lookup(self, embedding, hotel_id: str | None = None) -> str | None:
+        generation = await self._shared_generation()
+        if generation != self._generation:
+            self._reset()
+            self._generation = generation
+
+        if self._count == 0:
+            self.misses += 1
+            return None
+
+        query = self._normalize(embedding)
+        scores = self._vectors[:self._count] @ query
+        now = time.monotonic()
+        scores[now - self._stored_at[:self._count] > self._ttl] = -1.0
+        scores[self._hotel_ids[:self._count] != hotel_id] = -1.0
+
+        best = int(np.argmax(scores))
+        if scores[best] < self._threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.saved_seconds += float(self._costs[best])
+        self._used_at[best] = now
+        return self._answers[best]
+
+    def store(self, embedding, answer: str, cost_seconds: float, hotel_id: str | None = None):
+        """Cache `answer`, remembering how long it took to produce."""
+        vector = self._normalize(embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self._size, vector.shape[0]), dtype=np.float32)
+
+        existing = None
+        if self._count:
+            existing = self._vectors[:self._count] @ vector
+            existing[self._hotel_ids[:self._count] != hotel_id] = -1.0
+        if existing is not None and existing.max() >= self._threshold:
+            # Refresh the entry that would have answered this query instead of
+            # adding a near-duplicate (e.g. several coalesced requests storing)
+            slot = int(np.argmax(existing))
+        elif self._count < self._size:
+            slot = self._count
+            self._count += 1
+        else:
+            slot = int(np.argmin(self._used_at))
+
+        now = time.monotonic()
+        self._vectors[slot] = vector
+        self._answers[slot] = answer
+        self._hotel_ids[slot] = hotel_id
+        self._costs[slot] = cost_seconds
+        self._stored_at[slot] = now
+        self._used_at[slot] = now
+
+    def clear(self):
+        self._reset()
+        if self._shared:
+            try:
+                self._generation = get_shared_store().incr(GENERATION_KEY)
+            except Exception:
+                pass
+
+    def expire_hotel(self, hotel_id: str):
+        """Drop this worker's entries for `hotel_id`, e.g. after its data
+        changed; every worker notices such a change on its own."""
+        if self._count == 0:
+            return
+        stale = np.flatnonzero(self._hotel_ids[:self._count] == hotel_id)
+        for slot in stale:
+            self._answers[slot] = None
+        # Past the TTL so lookups skip them, least recently used so they are reused first
+        self._stored_at[stale] = -np.inf
+        self._used_at[stale] = 0
+
+    def _reset(self):
+        self._answers = [None] * self._size
+        self._used_at[:] = 0
+        self._count = 0
+
+    async def _shared_generation(self) -> int:
+        if not self._shared:
+            return 0
+        store = get_shared_store()
+        try:
+            return int(await offload(store, store.get, GENERATION_KEY) or 0)
+        except Exception:
+            return self._generation
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(float(self.saved_seconds), 3),
+        }
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = SemanticAnswerCache(
+    size=ANSWER_CACHE_SIZE,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    ttl=ANSWER_CACHE_TTL,
+    shared=SHARED_STATE_URL != "memory://",
+)
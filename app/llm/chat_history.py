@@ -1,32 +1,233 @@
-from app.core.config.supabase_client import supabase
+import asyncio
 import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.config.supabase_client import get_supabase, get_async_supabase
 
 logger = logging.getLogger(__name__)
 
+# "supabase" stores messages in the remote `chat_messages` table, "sqlite"
+# in a local WAL-mode database at CHAT_HISTORY_PATH (single node, no network)
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "supabase")
+CHAT_HISTORY_PATH = os.getenv(
+    "CHAT_HISTORY_PATH",
+    str(Path(__file__).parent.parent / "data" / "chat_history.sqlite3")
+)
+
+
+class SupabaseHistoryStore:
+    """Chat history in the Supabase `chat_messages` table.
+
+    Rows are `{"sender", "message", "created_at"}`, oldest first. Every
+    method raises on failure; the module-level functions log and degrade.
+    """
+
+    def _query(self, client, session_id: str, limit: int | None, after: str | None):
+        """Build the (session_id, created_at) ordered history query.
+
+        With `after`, rows strictly newer than that cursor are returned oldest
+        first. Without it, `limit` selects the newest rows (returned newest
+        first, the caller flips them back) so the window is served from the
+        index. Returns the query and whether the rows need reversing.
+        """
+        query = (
+            client
+            .table("chat_messages")
+            .select("sender, message, created_at")
+            .eq("session_id", session_id)
+        )
+
+        if after is not None:
+            query = query.gt("created_at", after).order("created_at")
+            reverse = False
+        elif limit is not None:
+            query = query.order("created_at", desc=True)
+            reverse = True
+        else:
+            query = query.order("created_at")
+            reverse = False
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query, reverse
+
+    def append_many(self, rows: list[dict]):
+        return get_supabase().table("chat_messages").insert(rows).execute()
+
+    def history(self, session_id: str, limit: int | None = None, after: str | None = None) -> list:
+        query, reverse = self._query(get_supabase(), session_id, limit, after)
+        rows = query.execute().data or []
+        return rows[::-1] if reverse else rows
+
+    async def aappend_many(self, rows: list[dict]):
+        client = await get_async_supabase()
+        return await client.table("chat_messages").insert(rows).execute()
+
+    async def ahistory(self, session_id: str, limit: int | None = None, after: str | None = None) -> list:
+        client = await get_async_supabase()
+        query, reverse = self._query(client, session_id, limit, after)
+        rows = (await query.execute()).data or []
+        return rows[::-1] if reverse else rows
+
+
+class SQLiteHistoryStore:
+    """Chat history in a local SQLite database, the same interface as
+    `SupabaseHistoryStore`.
+
+    WAL mode lets readers run alongside the writer and each thread keeps its
+    own connection, whose statement cache reuses the prepared queries below.
+    Batches are inserted with one `executemany` per transaction. The async
+    methods run the same queries on a worker thread.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS chat_messages ("
+        "id INTEGER PRIMARY KEY, session_id TEXT NOT NULL, sender TEXT NOT NULL, "
+        "message TEXT NOT NULL, created_at TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS chat_messages_session_created "
+        "ON chat_messages (session_id, created_at)",
+    )
+    INSERT = "INSERT INTO chat_messages (session_id, sender, message, created_at) VALUES (?, ?, ?, ?)"
+    SELECT_ALL = (
+        "SELECT sender, message, created_at FROM chat_messages "
+        "WHERE session_id = ? ORDER BY created_at, id LIMIT ?"
+    )
+    SELECT_AFTER = (
+        "SELECT sender, message, created_at FROM chat_messages "
+        "WHERE session_id = ? AND created_at > ? ORDER BY created_at, id LIMIT ?"
+    )
+    SELECT_TAIL = (
+        "SELECT sender, message, created_at FROM chat_messages "
+        "WHERE session_id = ? ORDER BY created_at DESC, id DESC LIMIT ?"
+    )
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def append_many(self, rows: list[dict]) -> list[dict]:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{**row, "created_at": row.get("created_at") or now} for row in rows]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                self.INSERT,
+                [(r["session_id"], r["sender"], r["message"], r["created_at"]) for r in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def history(self, session_id: str, limit: int | None = None, after: str | None = None) -> list:
+        conn = self._connect()
+        if after is not None:
+            cursor = conn.execute(self.SELECT_AFTER, (session_id, after, -1 if limit is None else limit))
+        elif limit is not None:
+            return [dict(r) for r in conn.execute(self.SELECT_TAIL, (session_id, limit)).fetchall()][::-1]
+        else:
+            cursor = conn.execute(self.SELECT_ALL, (session_id, -1))
+        return [dict(r) for r in cursor.fetchall()]
+
+    async def aappend_many(self, rows: list[dict]) -> list[dict]:
+        return await asyncio.to_thread(self.append_many, rows)
+
+    async def ahistory(self, session_id: str, limit: int | None = None, after: str | None = None) -> list:
+        return await asyncio.to_thread(self.history, session_id, limit, after)
+
+
+def create_history_store(backend: str):
+    if backend == "supabase":
+        return SupabaseHistoryStore()
+    if backend == "sqlite":
+        return SQLiteHistoryStore(CHAT_HISTORY_PATH)
+    raise ValueError(f"Unsupported CHAT_HISTORY_BACKEND: {backend}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the store behind CHAT_HISTORY_BACKEND, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_history_store(CHAT_HISTORY_BACKEND)
+    return _store
+
+
+def _row(session_id: str, sender: str, message: str) -> dict:
+    return {"session_id": session_id, "sender": sender, "message": message}
+
+
 def add_message(session_id: str, sender: str, message: str):
+    return add_messages([_row(session_id, sender, message)])
+
+
+def add_messages(rows: list[dict]):
     try:
-        result = supabase.table("chat_messages").insert({
-            "session_id": session_id,
-            "sender": sender,
-            "message": message
-        }).execute()
-        return result
+        return get_history_store().append_many(rows)
     except Exception as e:
-        logger.error(f"Failed to add message to Supabase: {e}")
+        logger.error(f"Failed to add {len(rows)} messages to chat history: {e}")
+        # Return None to allow the app to continue without DB
         return None
 
 
-def get_history(session_id: str):
+def get_history(session_id: str, limit: int | None = None, after: str | None = None):
     try:
-        response = (
-            supabase
-            .table("chat_messages")
-            .select("sender, message, created_at")
-            .eq("session_id", session_id)
-            .order("created_at")
-            .execute()
-        )
-        return response.data
+        return get_history_store().history(session_id, limit=limit, after=after)
     except Exception as e:
-        logger.error(f"Failed to get history from Supabase: {e}")
+        logger.error(f"Failed to get chat history: {e}")
         return []
+
+
+def tail(session_id: str, n: int):
+    """The newest `n` messages of a session, oldest first."""
+    return get_history(session_id, limit=n)
+
+
+async def aadd_message(session_id: str, sender: str, message: str):
+    return await aadd_messages([_row(session_id, sender, message)])
+
+
+async def aadd_messages(rows: list[dict]):
+    try:
+        return await get_history_store().aappend_many(rows)
+    except Exception as e:
+        logger.error(f"Failed to add {len(rows)} messages to chat history: {e}")
+        return None
+
+
+async def aget_history(session_id: str, limit: int | None = None, after: str | None = None):
+    try:
+        return await get_history_store().ahistory(session_id, limit=limit, after=after)
+    except Exception as e:
+        logger.error(f"Failed to get chat history: {e}")
+        return []
+
+
+async def atail(session_id: str, n: int):
+    """The newest `n` messages of a session, oldest first."""
+    return await aget_history(session_id, limit=n)
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import os
+
+from app.core.config.http_clients import upstream_retry
+from app.core.config.shared_state import get_shared_store, offload
+from app.llm.history_cache import HISTORY_CACHE_TTL, history_cache
+from app.llm.history_context import format_history_lines
+from app.llm.llm_service import get_llm
+from app.llm.prompt_builder import HISTORY_MAX_MESSAGES
+from app.metrics import record_token_usage, stage, start_timings
+from app.utils.llm_utils import normalize_response
+
+logger = logging.getLogger(__name__)
+
+# Once this many messages have piled up before the recent window they are
+# folded into the session's running summary (0 disables summarization)
+SUMMARY_AFTER_MESSAGES = int(os.getenv("SUMMARY_AFTER_MESSAGES", "8"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "250"))
+# Outlives the cached history window, so a returning guest keeps the summary
+SUMMARY_TTL = float(os.getenv("SUMMARY_TTL", str(max(HISTORY_CACHE_TTL, 7 * 24 * 3600))))
+# How long a worker may hold a session's summary before another can take over
+SUMMARY_CLAIM_TTL = 120
+
+SUMMARY_PROMPT = (
+    "Resume la conversación entre un huésped y el asistente virtual del hotel "
+    "para que el asistente pueda continuarla sin leer los mensajes.\n"
+    "- Conserva los datos que dio el huésped (nombre, fechas, número de personas, preferencias).\n"
+    "- Indica qué preguntó y qué se le respondió, y lo que quedó pendiente.\n"
+    "- Integra el resumen anterior, si lo hay, con los mensajes nuevos.\n"
+    "- Frases breves, en español, sin inventar nada."
+)
+
+
+@upstream_retry
+async def _asummarize(previous: str | None, rows: list) -> str:
+    from langchain.messages import SystemMessage, HumanMessage
+
+    content = ""
+    if previous:
+        content += f"RESUMEN ANTERIOR:\n{previous}\n\n"
+    content += "MENSAJES NUEVOS:\n" + "\n".join(format_history_lines(rows, len(rows)))
+
+    response = await get_llm().ainvoke(
+        [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=content)],
+        max_tokens=SUMMARY_MAX_TOKENS
+    )
+    record_token_usage(response)
+    return normalize_response(response.content).strip()
+
+
+class ConversationSummaries:
+    """Running summaries of long sessions, kept in the shared store.
+
+    A summary covers the session up to its `upto` cursor (the `created_at`
+    of the last message folded in); answers use it plus the messages after
+    it, so they never read the older ones. After each turn `schedule`
+    adds the new messages to a per-session counter in the shared store;
+    only once `after_messages` have piled up before the newest
+    `keep_recent` is the history read and folded in with one LLM call. A
+    claim in the shared store keeps two workers from summarizing the same
+    session at once.
+    """
+
+    def __init__(self, after_messages: int, keep_recent: int, ttl: float):
+        self._after = after_messages
+        self._keep = keep_recent
+        self._ttl = ttl
+        self._tasks: set[asyncio.Task] = set()
+        self._compacting: set[str] = set()
+        self.runs = 0
+        self.failures = 0
+
+    @property
+    def context_messages(self) -> int:
+        """How many of the newest messages to read for an answer: the recent
+        window plus those waiting to be summarized."""
+        return self._keep + max(0, self._after)
+
+    def get(self, session_id: str) -> dict | None:
+        """The stored `{"text", "upto", "messages"}` summary of a session, if any."""
+        try:
+            data = get_shared_store().get(f"summary:{session_id}")
+        except Exception as e:
+            logger.warning(f"Failed to read conversation summary: {e}")
+            return None
+        return None if data is None else json.loads(data)
+
+    def select(self, session_id: str, rows: list) -> tuple[str | None, list]:
+        """Split the session's newest `context_messages` rows into the
+        summary text (None if there is none yet) and the messages it doesn't
+        cover. Without a summary only the recent window is kept."""
+        return self._split(self.get(session_id), rows)
+
+    async def context(self, session_id: str) -> tuple[str | None, list]:
+        """`select` over the session's cached history."""
+        store = get_shared_store()
+        summary, rows = await asyncio.gather(
+            offload(store, self.get, session_id),
+            history_cache.get(session_id, limit=self.context_messages),
+        )
+        return self._split(summary, rows)
+
+    def _split(self, summary: dict | None, rows: list) -> tuple[str | None, list]:
+        if summary is None:
+            return None, rows[-self._keep:]
+        return summary["text"], [r for r in rows if r["created_at"] > summary["upto"]]
+
+    def schedule(self, session_id: str, added: int = 2):
+        """Count the `added` messages of a turn (the guest's and the reply)
+        and fold older messages into the summary in the background, if due."""
+        if self._after <= 0:
+            return
+        task = asyncio.create_task(self._run(session_id, added))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, session_id: str, added: int):
+        # Its own stage timings, not those of the request that scheduled it
+        start_timings()
+        try:
+            store = get_shared_store()
+            # Messages after the summary cursor. A new counter (first turn, or
+            # it expired) doesn't know the older history yet, so it is checked
+            # and corrected by reading the history once
+            pending = await offload(store, store.incr, f"summary-pending:{session_id}", added, self._ttl)
+            due = pending >= self._keep + self._after or pending == added
+            if not due or session_id in self._compacting:
+                return
+            self._compacting.add(session_id)
+            try:
+                await self.compact(session_id, pending)
+            finally:
+                self._compacting.discard(session_id)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to summarize session {session_id}: {e}")
+
+    async def compact(self, session_id: str, pending: int | None = None) -> bool:
+        """Summarize the session's messages older than the recent window.
+
+        `pending` is the counter value that made it due; it is corrected to
+        the messages actually left unsummarized. Returns whether a new
+        summary was stored.
+        """
+        store = get_shared_store()
+        current = await offload(store, self.get, session_id)
+        rows = await history_cache.get(session_id, after=current["upto"] if current else None)
+        older = rows[:-self._keep] if self._keep else rows
+        if len(older) < self._after:
+            await self._recount(session_id, pending, len(rows))
+            return False
+        if not await self._claim(session_id):
+            # The worker holding the claim recounts when it is done
+            return False
+
+        claim = f"summary-claim:{session_id}"
+        try:
+            with stage("summarize"):
+                text = await _asummarize(current["text"] if current else None, older)
+            summary = {
+                "text": text,
+                "upto": older[-1]["created_at"],
+                "messages": (current["messages"] if current else 0) + len(older),
+            }
+            await offload(store, store.set, f"summary:{session_id}", json.dumps(summary).encode("utf-8"), self._ttl)
+        finally:
+            await offload(store, store.delete, claim)
+
+        await self._recount(session_id, pending, len(rows) - len(older))
+        self.runs += 1
+        logger.info(f"Summarized {len(older)} messages of session {session_id} ({summary['messages']} in total)")
+        return True
+
+    async def _claim(self, session_id: str) -> bool:
+        store = get_shared_store()
+        return await offload(store, store.incr, f"summary-claim:{session_id}", 1, SUMMARY_CLAIM_TTL) == 1
+
+    async def _recount(self, session_id: str, pending: int | None, unsummarized: int):
+        """Bring the pending counter from `pending` to `unsummarized`, keeping
+        messages counted meanwhile."""
+        if pending is not None and pending != unsummarized:
+            store = get_shared_store()
+            await offload(store, store.incr, f"summary-pending:{session_id}", unsummarized - pending, self._ttl)
+
+    async def stop(self):
+        # An interrupted summary is simply redone after the session's next turn
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"in_progress": len(self._compacting), "runs": self.runs, "failures": self.failures}
+
+
+conversation_summaries = ConversationSummaries(
+    after_messages=SUMMARY_AFTER_MESSAGES,
+    keep_recent=HISTORY_MAX_MESSAGES,
+    ttl=SUMMARY_TTL,
+)
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config.shared_state import get_shared_store, offload, SHARED_STATE_URL
+from app.utils.file_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# Optional .npz file that keeps warm entries across worker restarts
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+SHARED_EMBEDDING_TTL = float(os.getenv("SHARED_EMBEDDING_TTL", str(7 * 24 * 3600)))
+
+
+class EmbeddingCache:
+    """LRU cache of query embeddings stored as read-only float32 arrays.
+
+    Keys are expected to be normalized already (see `normalize_text`). With
+    `shared`, entries are also written to the cross-worker store and local
+    misses are looked up there before calling the API; async callers use
+    `aget`/`aput`, which do that in a thread.
+    """
+
+    def __init__(self, maxsize: int, shared: bool = False):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> np.ndarray | None:
+        vector = self._local_get(key)
+        if vector is not None:
+            return vector
+        return self._from_shared(key, self._shared_get(key))
+
+    async def aget(self, key: str) -> np.ndarray | None:
+        vector = self._local_get(key)
+        if vector is not None:
+            return vector
+        if self._shared:
+            vector = await offload(get_shared_store(), self._shared_get, key)
+        return self._from_shared(key, vector)
+
+    def put(self, key: str, embedding) -> np.ndarray:
+        vector = self._remember(key, embedding)
+        if self._shared:
+            self._shared_put(key, vector)
+        return vector
+
+    async def aput(self, key: str, embedding) -> np.ndarray:
+        vector = self._remember(key, embedding)
+        if self._shared:
+            await offload(get_shared_store(), self._shared_put, key, vector)
+        return vector
+
+    def _local_get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return vector
+
+    def _from_shared(self, key: str, vector: np.ndarray | None) -> np.ndarray | None:
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        return self._remember(key, vector)
+
+    def _shared_put(self, key: str, vector: np.ndarray):
+        try:
+            get_shared_store().set(self._shared_key(key), vector.tobytes(), ttl=SHARED_EMBEDDING_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to share embedding: {e}")
+
+    def _shared_get(self, key: str) -> np.ndarray | None:
+        if not self._shared:
+            return None
+        try:
+            data = get_shared_store().get(self._shared_key(key))
+        except Exception as e:
+            logger.warning(f"Failed to read shared embedding: {e}")
+            return None
+        return None if data is None else np.frombuffer(data, dtype=np.float32)
+
+    @staticmethod
+    def _shared_key(key: str) -> str:
+        return "emb:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, embedding) -> np.ndarray:
+        vector = np.array(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return vector
+
+    def load(self, path: str | Path) -> int:
+        path = Path(path)
+        if not path.exists():
+            return 0
+        try:
+            with np.load(path) as data:
+                keys, vectors = data["keys"].tolist(), data["vectors"]
+        except Exception as e:
+            logger.error(f"Failed to load embedding cache from {path}: {e}")
+            return 0
+        for key, vector in zip(keys, vectors):
+            self._remember(key, vector)
+        return len(keys)
+
+    def save(self, path: str | Path):
+        path = Path(path)
+        with self._lock:
+            if not self._entries:
+                return
+            keys = list(self._entries.keys())
+            vectors = np.stack(list(self._entries.values()))
+        atomic_write(path, lambda file: np.savez(file, keys=np.array(keys), vectors=vectors))
+
+    def stats(self) -> dict:
+        hits = self.hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache(maxsize=EMBEDDING_CACHE_SIZE, shared=SHARED_STATE_URL != "memory://")
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from app.core.config.shared_state import MemoryStore, SHARED_STATE_URL, get_shared_store, offload
+from app.llm.chat_history import aadd_messages, aget_history, atail
+from app.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "1000"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "1800"))
+HISTORY_CACHE_WINDOW = int(os.getenv("HISTORY_CACHE_WINDOW", "50"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "2"))
+HISTORY_FLUSH_BATCH = int(os.getenv("HISTORY_FLUSH_BATCH", "50"))
+# Failed inserts a message gets before it is dropped, and the most messages
+# kept waiting while the history store is down
+HISTORY_FLUSH_MAX_ATTEMPTS = int(os.getenv("HISTORY_FLUSH_MAX_ATTEMPTS", "10"))
+HISTORY_PENDING_MAX = int(os.getenv("HISTORY_PENDING_MAX", "5000"))
+
+
+class SessionHistoryCache:
+    """Per-session chat history cache with write-behind persistence.
+
+    Each session keeps only its newest `window` messages, served from a
+    TTL bounded cache that only hits the history store on a miss. With `shared`, the
+    windows live in the cross-worker store so a session sees the same
+    history whichever worker serves it; otherwise in a local LRU of
+    `maxsize` sessions. Appends go to the cache and to this worker's pending
+    queue, which a background task flushes to the history store in batched
+    inserts. Failed inserts are retried up to `max_attempts` times and at
+    most `max_pending` messages wait, so a store that keeps rejecting rows
+    can't grow the queue or block later messages. Reads and writes of the
+    shared windows run in a thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        window: int,
+        flush_interval: float,
+        flush_batch: int,
+        shared: bool = False,
+        max_attempts: int = HISTORY_FLUSH_MAX_ATTEMPTS,
+        max_pending: int = HISTORY_PENDING_MAX,
+    ):
+        self._sessions = None if shared else MemoryStore(maxsize)
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._window = window
+        self._pending: list[dict] = []
+        # Taken out of the queue by a flush whose insert hasn't returned yet
+        self._inflight: list[dict] = []
+        # Per session, how many rows completed flushes saved and the newest
+        # `window` of them, so a window filled from a DB read that raced a
+        # flush can add what the read missed; cleared (bumping the epoch)
+        # when it holds more than `maxsize` sessions
+        self._landed: dict[str, tuple[int, list]] = {}
+        self._flush_epoch = 0
+        self._attempts: dict[int, int] = {}
+        self._max_attempts = max_attempts
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        # Held across store calls, so only ever taken in a thread (see offload)
+        self._window_lock = threading.Lock()
+        self._flush_interval = flush_interval
+        self._flush_batch = flush_batch
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    async def get(self, session_id: str, limit: int | None = None, after: str | None = None) -> list:
+        """Return the session history, optionally only the newest `limit`
+        messages or the messages after the `after` cursor (a `created_at`)."""
+        rows = await self._window_rows(session_id)
+
+        if after is not None:
+            if len(rows) >= self._window and rows[0]["created_at"] > after:
+                # The cursor predates the cached window, page from the DB
+                rows = await aget_history(session_id, limit=limit, after=after) or []
+                rows += [r for r in self._unflushed(session_id) if r["created_at"] > after]
+            else:
+                rows = [r for r in rows if r["created_at"] > after]
+            return rows[:limit] if limit is not None else rows
+
+        return rows[-limit:] if limit is not None else rows
+
+    def _store(self):
+        return self._sessions if self._sessions is not None else get_shared_store()
+
+    def _load(self, session_id: str) -> list | None:
+        try:
+            data = self._store().get(f"hist:{session_id}")
+        except Exception as e:
+            logger.warning(f"Failed to read cached history: {e}")
+            return None
+        return None if data is None else json.loads(data)
+
+    def _save(self, session_id: str, rows: list):
+        try:
+            self._store().set(f"hist:{session_id}", json.dumps(rows).encode("utf-8"), ttl=self._ttl)
+        except Exception as e:
+            logger.warning(f"Failed to cache history: {e}")
+
+    def _unflushed(self, session_id: str) -> list:
+        """The session's rows that are not in the history store yet, oldest first."""
+        with self._lock:
+            return [self._public(r) for r in self._inflight + self._pending if r["session_id"] == session_id]
+
+    async def _window_rows(self, session_id: str) -> list:
+        store = self._store()
+        cached = await offload(store, self._load, session_id)
+        if cached is not None:
+            return cached
+
+        for attempt in range(3):
+            mark = self._flush_mark(session_id)
+            history = await atail(session_id, self._window) or []
+            cached = await offload(store, self._fill, session_id, history, mark if attempt < 2 else None)
+            if cached is not None:
+                return cached
+
+    def _flush_mark(self, session_id: str) -> tuple[int, int]:
+        with self._lock:
+            return self._flush_epoch, self._landed.get(session_id, (0, []))[0]
+
+    def _missed(self, session_id: str, mark: tuple[int, int]) -> tuple[list, list] | None:
+        """The session's rows flushed since `mark` and those not flushed yet,
+        which a DB read started at `mark` may lack; None if the flushed ones
+        are no longer known."""
+        with self._lock:
+            count, rows = self._landed.get(session_id, (0, []))
+            since = count - mark[1]
+            if mark[0] != self._flush_epoch or since > len(rows):
+                return None
+            unflushed = [self._public(r) for r in self._inflight + self._pending if r["session_id"] == session_id]
+            return rows[len(rows) - since:], unflushed
+
+    def _fill(self, session_id: str, history: list, mark: tuple | None) -> list | None:
+        with self._window_lock:
+            cached = self._load(session_id)
+            if cached is None:
+                if mark is None:
+                    landed, unflushed = [], self._unflushed(session_id)
+                else:
+                    missed = self._missed(session_id, mark)
+                    if missed is None:
+                        return None
+                    landed, unflushed = missed
+                # A flush that landed during the DB read took its rows out of
+                # the queue, and the read may not have seen them either
+                cached = (self._merge(list(history), landed) + unflushed)[-self._window:]
+                self._save(session_id, cached)
+            return cached
+
+    @staticmethod
+    def _merge(history: list, landed: list) -> list:
+        """`history` plus the `landed` rows it doesn't already end with.
+
+        Each flush inserts its rows in one batch, so the read saw a prefix
+        of them or none."""
+        def key(row):
+            return row["sender"], row["message"]
+        for seen in range(min(len(landed), len(history)), 0, -1):
+            if list(map(key, history[-seen:])) == list(map(key, landed[:seen])):
+                return history + landed[seen:]
+        return history + landed
+
+    async def append(self, session_id: str, sender: str, message: str, persist: bool = True) -> dict:
+        """Append a message and return it as a history row.
+
+        With `persist=False` it only goes to the cached window, never to the
+        history store.
+        """
+        row = {
+            "session_id": session_id,
+            "sender": sender,
+            "message": message,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        pending = await offload(self._store(), self._append, row, persist)
+        if pending >= self._flush_batch and self._wakeup is not None:
+            self._wakeup.set()
+        return self._public(row)
+
+    def _append(self, row: dict, persist: bool) -> int:
+        """Add `row` to its cached window and, with `persist`, to the pending
+        queue; returns the queue length."""
+        with self._window_lock:
+            # Not atomic across workers: a simultaneous append to the same
+            # session elsewhere can drop a row from the cached window (never
+            # from the DB, the pending queue still persists it)
+            cached = self._load(row["session_id"])
+            if cached is not None:
+                cached.append(self._public(row))
+                self._save(row["session_id"], cached[-self._window:])
+            with self._lock:
+                if persist:
+                    self._pending.append(row)
+                return len(self._pending)
+
+    async def flush(self) -> int:
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._inflight += rows
+        if not rows:
+            return 0
+
+        result = None
+        try:
+            with stage("history_flush"):
+                result = await aadd_messages(rows)
+        finally:
+            with self._lock:
+                flushed = {id(r) for r in rows}
+                self._inflight = [r for r in self._inflight if id(r) not in flushed]
+                if result is None:
+                    self._requeue(rows)
+                else:
+                    for row in rows:
+                        self._attempts.pop(id(row), None)
+                if result is not None:
+                    self._remember_landed(rows)
+        return 0 if result is None else len(rows)
+
+    def _remember_landed(self, rows: list[dict]):
+        """Record rows a flush saved (see `_missed`). Holds `_lock`."""
+        if len(self._landed) > self._maxsize:
+            self._landed.clear()
+            self._flush_epoch += 1
+        by_session: dict[str, list] = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(self._public(row))
+        for session_id, saved in by_session.items():
+            count, kept = self._landed.get(session_id, (0, []))
+            self._landed[session_id] = (count + len(saved), (kept + saved)[-self._window:])
+
+    def _requeue(self, rows: list[dict]):
+        """Put a failed batch back for the next attempt, ahead of anything
+        appended since, dropping what is past the limits. Holds `_lock`."""
+        retry = []
+        for row in rows:
+            attempts = self._attempts.pop(id(row), 0) + 1
+            if attempts < self._max_attempts:
+                self._attempts[id(row)] = attempts
+                retry.append(row)
+        self._pending[:0] = retry
+        dropped = len(rows) - len(retry)
+
+        overflow = len(self._pending) - self._max_pending
+        if overflow > 0:
+            # The oldest go first, as they already waited the longest
+            for row in self._pending[:overflow]:
+                self._attempts.pop(id(row), None)
+            del self._pending[:overflow]
+            dropped += overflow
+
+        if dropped:
+            logger.error(
+                f"Dropped {dropped} chat history messages that could not be saved "
+                f"({self._max_attempts} attempts, {self._max_pending} waiting at most)"
+            )
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let an in-flight flush finish rather than cancelling it mid-insert
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush chat history: {e}")
+
+    @staticmethod
+    def _public(row: dict) -> dict:
+        return {"sender": row["sender"], "message": row["message"], "created_at": row["created_at"]}
+
+
+history_cache = SessionHistoryCache(
+    maxsize=HISTORY_CACHE_SIZE,
+    ttl=HISTORY_CACHE_TTL,
+    window=HISTORY_CACHE_WINDOW,
+    flush_interval=HISTORY_FLUSH_INTERVAL,
+    flush_batch=HISTORY_FLUSH_BATCH,
+    shared=SHARED_STATE_URL != "memory://",
+)
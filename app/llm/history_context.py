@@ -1,6 +1,7 @@
-def build_history_context(history: list, limit: int = 4) -> str:
+def format_history_lines(history: list, limit: int = 4) -> list[str]:
+    """One "Usuario: ..."/"Asistente: ..." entry per message, oldest first."""
     if not history:
-        return ""
+        return []
 
     recent = history[-limit:]
     lines = []
@@ -9,4 +10,8 @@ def build_history_context(history: list, limit: int = 4) -> str:
         role = "Usuario" if m["sender"] == "user" else "Asistente"
         lines.append(f"{role}: {m['message']}")
 
-    return "\n".join(lines)
+    return lines
+
+
+def build_history_context(history: list, limit: int = 4) -> str:
+    return "\n".join(format_history_lines(history, limit))
@@ -0,0 +1,81 @@
+import os
+
+from app.utils.text_utils import normalize_text
+
+# A lexical hit is trusted without embeddings when it contains every query
+# term, scores at least this much and leads the runner-up by this factor
+LEXICAL_MIN_SCORE = float(os.getenv("LEXICAL_MIN_SCORE", "3.0"))
+LEXICAL_MARGIN = float(os.getenv("LEXICAL_MARGIN", "1.2"))
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+# Relevance cutoffs: a document is kept if it passes either of them
+HYBRID_MIN_SIMILARITY = float(os.getenv("HYBRID_MIN_SIMILARITY", "0.25"))
+HYBRID_MIN_LEXICAL_SHARE = float(os.getenv("HYBRID_MIN_LEXICAL_SHARE", "0.5"))
+RRF_K = 60
+
+
+def lexical_confident(hits: list[dict]) -> bool:
+    if not hits:
+        return False
+    top = hits[0]
+    if top["coverage"] < 1.0 or top["score"] < LEXICAL_MIN_SCORE:
+        return False
+    return len(hits) == 1 or top["score"] >= LEXICAL_MARGIN * hits[1]["score"]
+
+
+def lexical_only(hits: list[dict], k: int) -> list[str]:
+    """Hits close enough to the best one, for queries answered lexically."""
+    best = hits[0]["score"]
+    return _dedup(h["content"] for h in hits if h["score"] >= HYBRID_MIN_LEXICAL_SHARE * best)[:k]
+
+
+def fuse(lexical_hits: list[dict], vector_rows: list[dict], k: int) -> list[str]:
+    """Reciprocal rank fusion of both rankings, deduplicated and cut off.
+
+    Documents that are neither similar enough to the query embedding nor
+    close to the best lexical score are dropped, so fewer than `k` (or no)
+    documents may come back.
+    """
+    scores: dict[str, float] = {}
+    contents: dict[str, str] = {}
+    relevant = set()
+
+    best_lexical = lexical_hits[0]["score"] if lexical_hits else 0.0
+    for rank, hit in enumerate(lexical_hits):
+        key = normalize_text(hit["content"])
+        contents.setdefault(key, hit["content"])
+        scores[key] = scores.get(key, 0.0) + 1 / (RRF_K + rank + 1)
+        if hit["score"] >= HYBRID_MIN_LEXICAL_SHARE * best_lexical:
+            relevant.add(key)
+
+    seen = set()
+    for row in vector_rows:
+        content = row.get("content")
+        if content is None:
+            continue
+        key = normalize_text(str(content))
+        if key in seen:
+            # Duplicate row (e.g. a legacy copy of a document), count it once
+            continue
+        rank = len(seen)
+        seen.add(key)
+        contents.setdefault(key, str(content))
+        scores[key] = scores.get(key, 0.0) + 1 / (RRF_K + rank + 1)
+        similarity = row.get("similarity")
+        # Rows without a similarity can't be judged, keep them
+        if similarity is None or similarity >= HYBRID_MIN_SIMILARITY:
+            relevant.add(key)
+
+    ranked = sorted((key for key in scores if key in relevant), key=scores.get, reverse=True)
+    return [contents[key] for key in ranked[:k]]
+
+
+def _dedup(contents) -> list[str]:
+    seen = set()
+    unique = []
+    for content in contents:
+        key = normalize_text(content)
+        if key not in seen:
+            seen.add(key)
+            unique.append(content)
+    return unique
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.file_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+INTENT_EXAMPLES_PATH = Path(__file__).parent.parent / "data" / "intent_examples.json"
+INTENT_CENTROIDS_PATH = Path(os.getenv(
+    "INTENT_CENTROIDS_PATH",
+    Path(__file__).parent.parent / "data" / "hotel_knowledge_intents.npz"
+))
+
+# The router answers guests with canned templates, so it stays off until a
+# threshold checked with `python -m app.scripts.bench_router` is set
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD")) if os.getenv("INTENT_ROUTER_THRESHOLD") else None
+# Required lead of the best centroid over the runner-up
+INTENT_ROUTER_MARGIN = float(os.getenv("INTENT_ROUTER_MARGIN", "0.05"))
+# How often (seconds) routing may stat the centroids file for a rebuild by another worker
+INTENT_CENTROIDS_CHECK_INTERVAL = float(os.getenv("INTENT_CENTROIDS_CHECK_INTERVAL", "5"))
+
+
+def load_examples(path: Path = INTENT_EXAMPLES_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def examples_hash(examples: dict) -> str:
+    return hashlib.sha256(json.dumps(examples, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def build_centroids(examples: dict, emb, path: Path = INTENT_CENTROIDS_PATH) -> bool:
+    """Embed the example utterances and save one normalized centroid per intent.
+
+    Skipped (returns False) when the saved centroids were built from the same
+    examples.
+    """
+    digest = examples_hash(examples)
+    if path.exists():
+        with np.load(path) as data:
+            if str(data["examples_hash"]) == digest:
+                return False
+
+    intents = list(examples)
+    texts = [t for i in intents for t in examples[i]]
+    vectors = np.asarray(emb.embed_documents(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    centroids = []
+    start = 0
+    for intent in intents:
+        count = len(examples[intent])
+        centroid = vectors[start:start + count].mean(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+        start += count
+
+    atomic_write(path, lambda file: np.savez(
+        file, intents=np.array(intents), centroids=np.stack(centroids), examples_hash=np.array(digest)
+    ))
+    return True
+
+
+class CentroidIntentRouter:
+    """Routes a query embedding to the nearest intent centroid when confident.
+
+    Counts every decision so the share of fallback turns kept away from the
+    LLM can be reported. The centroids file is re-read when its mtime
+    changes, so a rebuild in one worker reaches the others. Without a
+    `threshold` it never routes.
+    """
+
+    def __init__(self, threshold: float | None, margin: float, check_interval: float = INTENT_CENTROIDS_CHECK_INTERVAL):
+        self._threshold = threshold
+        self._margin = margin
+        self._check_interval = check_interval
+        self._intents: list[str] = []
+        self._centroids: np.ndarray | None = None
+        self._path = INTENT_CENTROIDS_PATH
+        self._mtime: float | None = None
+        self._checked_at = time.monotonic()
+        self.routed: dict[str, int] = {}
+        self.passed = 0
+
+    def load(self, path: Path = INTENT_CENTROIDS_PATH) -> bool:
+        self._path = path
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        with np.load(path) as data:
+            intents, centroids = data["intents"].tolist(), data["centroids"].astype(np.float32)
+        self._intents, self._centroids, self._mtime = intents, centroids, mtime
+        return True
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval:
+            return
+        self._checked_at = now
+        try:
+            changed = os.stat(self._path).st_mtime != self._mtime
+        except OSError:
+            changed = False
+        if changed:
+            try:
+                self.load(self._path)
+            except Exception as e:
+                # Keep routing with the current centroids, retried on the next check
+                logger.warning(f"Failed to reload intent centroids: {e}")
+
+    def route(self, query_embedding) -> str | None:
+        """Return the routed intent, or None to let the LLM answer."""
+        if self._threshold is None:
+            return None
+        self._refresh()
+        if self._centroids is None:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self._centroids @ (query / norm if norm else query)
+
+        order = np.argsort(-scores)
+        best = scores[order[0]]
+        runner_up = scores[order[1]] if len(order) > 1 else -1.0
+
+        if best < self._threshold or best - runner_up < self._margin:
+            self.passed += 1
+            return None
+
+        intent = self._intents[int(order[0])]
+        self.routed[intent] = self.routed.get(intent, 0) + 1
+        return intent
+
+    def stats(self) -> dict:
+        routed = sum(self.routed.values())
+        decisions = routed + self.passed
+        return {
+            "enabled": self._threshold is not None,
+            "loaded": self._centroids is not None,
+            "routed": dict(self.routed),
+            "passed_to_llm": self.passed,
+            "llm_avoidance_rate": round(routed / decisions, 4) if decisions else 0.0,
+        }
+
+
+intent_router = CentroidIntentRouter(threshold=INTENT_ROUTER_THRESHOLD, margin=INTENT_ROUTER_MARGIN)
@@ -0,0 +1,79 @@
+import math
+import re
+from collections import Counter
+
+from app.utils.text_utils import normalize_text
+
+# Accent-folded, so "qué"/"que" and "está"/"esta" are one entry
+STOPWORDS = set("""
+a al algo algun alguna alguno ante como con cual cuales cuando cuanto de del donde
+el ella en entre es esta estan este esto ha hay la las le les lo los me mi mis muy
+no nos o os para pero por puedo puede que se si sin sobre son su sus te tiene tienen
+tu un una unas unos y ya
+an and are at be can do does for how i in is it of on or the there to what when where
+with you
+""".split())
+
+
+def _stem(token: str) -> str:
+    # Just enough to match Spanish plurals ("habitaciones" -> "habitacion")
+    if len(token) > 5 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(t) for t in re.findall(r"\w+", normalize_text(text)) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index over the knowledge documents, scored with BM25.
+
+    `search` also reports the share of the query terms each hit contains,
+    which the hybrid retriever uses to trust a lexical match on its own.
+    """
+
+    def __init__(self, documents: list[str], k1: float = 1.2, b: float = 0.75):
+        self.documents = documents
+        self._k1 = k1
+        self._b = b
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths = []
+
+        for doc_id, document in enumerate(documents):
+            terms = Counter(tokenize(document))
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+
+        count = len(documents)
+        self._avg_length = sum(self._lengths) / count if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 10) -> list[dict]:
+        """Return up to `k` `{"content", "score", "coverage"}` hits, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        scores: dict[int, float] = {}
+        matched: Counter = Counter()
+        for term in terms:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                norm = 1 - self._b + self._b * self._lengths[doc_id] / self._avg_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self._k1 + 1) / (tf + self._k1 * norm)
+                matched[doc_id] += 1
+
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [
+            {"content": self.documents[i], "score": scores[i], "coverage": matched[i] / len(terms)}
+            for i in top
+        ]
@@ -1,53 +1,117 @@
-from langchain_openai import ChatOpenAI
-from langchain.messages import SystemMessage, HumanMessage
-from app.llm.vector_store import retrieve_relevant_context
-from app.llm.history_context import build_history_context
+from app.llm.vector_store import retrieve_relevant_context, aretrieve_relevant_context
+from app.llm.prompt_builder import build_prompt, LLM_MODEL
+from app.hotel_snapshot import get_hotel_snapshot
+from app.llm.singleflight import SingleFlight
+from app.core.config.http_clients import get_http_client, get_async_http_client, upstream_retry, HTTP_TIMEOUT
 from app.utils.llm_utils import normalize_response
+from app.metrics import record_token_usage
+from app.utils.text_utils import normalize_text
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.2
-)
-
-def llm_fallback_answer(user_message: str, history: list) -> str:
-    knowledge = retrieve_relevant_context(user_message)
-
-    history_ctx = build_history_context(history)
-
-    system_prompt = (
-        "Eres Costy, el asistente virtual oficial del Hotel Costa Azul, un hotel ubicado en Cádiz, España.\n\n"
-
-        "TU MISIÓN:\n"
-        "- Proporcionar respuestas completas, útiles y amigables sobre el hotel.\n"
-        "- Usar toda la información disponible para resolver dudas por completo.\n"
-        "- Elaborar respuestas detalladas combinando múltiples datos cuando sea relevante.\n"
-        "- Anticipar preguntas relacionadas y ofrecer información adicional útil.\n\n"
-
-        "REGLAS IMPORTANTES:\n"
-        "- Responde SOLO usando la información proporcionada del hotel.\n"
-        "- NO inventes servicios, horarios, precios ni información que no esté en el conocimiento.\n"
-        "- Puedes combinar, reformular y elaborar sobre la información existente.\n"
-        "- Da respuestas completas y estructuradas (usa emojis, saltos de línea, listas).\n"
-        "- SOLO deriva a recepción si: 1) No hay información relevante, 2) Se pide hablar con humano, 3) Se requiere acción (reserva, cambio).\n"
-        "- Si hay información parcial, da lo que sabes y sugiere recepción solo para detalles específicos.\n\n"
-
-        "CONOCIMIENTO DEL HOTEL (usa toda esta información para responder):\n"
-        f"{knowledge}\n\n"
-
-        "CONTEXTO DE LA CONVERSACIÓN (reciente):\n"
-        f"{history_ctx}\n\n"
-        
-        "ESTILO DE RESPUESTA:\n"
-        "- Amigable, profesional y cercano.\n"
-        "- Usa emojis relevantes para hacer las respuestas más atractivas.\n"
-        "- Estructura la información con saltos de línea y vietas cuando sea apropiado.\n"
-        "- Sé conciso pero completo - no omitas detalles útiles.\n"
-    )
-
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=user_message)
-    ]
-
-    response = llm.invoke(messages).content
-    return normalize_response(response)
\ No newline at end of file
+_llm = None
+
+_answer_flight = SingleFlight("llm_answer")
+
+
+def get_llm():
+    """Return the shared chat model client, creating it on first use."""
+    global _llm
+    if _llm is None:
+        from langchain_openai import ChatOpenAI
+        _llm = ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0.2,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            request_timeout=HTTP_TIMEOUT,
+            max_retries=0,
+            # Have streamed completions report token usage in their last chunk
+            stream_usage=True
+        )
+    return _llm
+
+
+def is_standalone(history: list, summary: str | None = None) -> bool:
+    """Whether nothing precedes the current message in the session, so the
+    answer depends on the hotel and the question alone (`history` includes
+    the current message)."""
+    return len(history) <= 1 and not summary
+
+
+def llm_fallback_answer(
+    user_message: str,
+    history: list,
+    hotel_id: str | None = None,
+    summary: str | None = None
+) -> str:
+    knowledge = retrieve_relevant_context(user_message, hotel_id=hotel_id)
+
+    messages = build_prompt(user_message, knowledge, history, get_hotel_snapshot(hotel_id).system_prompt, summary)
+
+    response = _invoke(messages)
+    record_token_usage(response)
+    return normalize_response(response.content)
+
+
+async def allm_fallback_answer(
+    user_message: str,
+    history: list,
+    knowledge: str | None = None,
+    hotel_id: str | None = None,
+    summary: str | None = None
+) -> str:
+    if knowledge is None:
+        knowledge = await aretrieve_relevant_context(user_message, hotel_id=hotel_id)
+    snapshot = get_hotel_snapshot(hotel_id)
+
+    # Identical concurrent standalone questions can share one completion
+    if is_standalone(history, summary):
+        return await _answer_flight.do(
+            (snapshot.hotel_id, normalize_text(user_message)),
+            lambda: _aanswer(user_message, knowledge, history, snapshot.system_prompt)
+        )
+
+    return await _aanswer(user_message, knowledge, history, snapshot.system_prompt, summary)
+
+
+async def _aanswer(
+    user_message: str,
+    knowledge: str,
+    history: list,
+    system_prompt: str,
+    summary: str | None = None
+) -> str:
+    messages = build_prompt(user_message, knowledge, history, system_prompt, summary)
+
+    response = await _ainvoke(messages)
+    record_token_usage(response)
+    return normalize_response(response.content)
+
+
+@upstream_retry
+def _invoke(messages):
+    return get_llm().invoke(messages)
+
+
+@upstream_retry
+async def _ainvoke(messages):
+    return await get_llm().ainvoke(messages)
+
+
+async def astream_fallback_answer(
+    user_message: str,
+    history: list,
+    knowledge: str | None = None,
+    hotel_id: str | None = None,
+    summary: str | None = None
+):
+    """Yield the fallback answer text chunk by chunk as the model generates it."""
+    if knowledge is None:
+        knowledge = await aretrieve_relevant_context(user_message, hotel_id=hotel_id)
+
+    messages = build_prompt(user_message, knowledge, history, get_hotel_snapshot(hotel_id).system_prompt, summary)
+
+    async for chunk in get_llm().astream(messages):
+        record_token_usage(chunk)
+        text = normalize_response(chunk)
+        if text:
+            yield text
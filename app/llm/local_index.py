@@ -0,0 +1,78 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.data_loader import DEFAULT_HOTEL_ID, resolve_hotel_id
+from app.utils.file_utils import atomic_write
+
+# "supabase" queries the match_hotel_knowledge RPC, "local" searches the
+# index persisted by `python -m app.scripts.embeddings_test --local`
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "supabase")
+LOCAL_INDEX_PATH = Path(__file__).parent.parent / "data" / "hotel_knowledge"
+
+
+def local_index_path(hotel_id: str | None = None) -> Path:
+    """One index per hotel: LOCAL_INDEX_PATH for the default hotel,
+    `hotel_knowledge_<hotel_id>` next to it for the others."""
+    hotel_id = resolve_hotel_id(hotel_id)
+    if hotel_id == DEFAULT_HOTEL_ID:
+        return LOCAL_INDEX_PATH
+    return LOCAL_INDEX_PATH.with_name(f"{LOCAL_INDEX_PATH.name}_{hotel_id}")
+
+
+class LocalVectorIndex:
+    """In-memory cosine-similarity index over the hotel knowledge documents.
+
+    Vectors are kept as one contiguous, L2-normalized float32 matrix so top-k
+    is a single matrix-vector product. On disk it is `<prefix>.npy` (the
+    matrix, memory-mapped on load) next to `<prefix>.json` (the contents).
+    """
+
+    def __init__(self, vectors: np.ndarray, contents: list[str]):
+        if len(vectors) != len(contents):
+            raise ValueError(f"Index has {len(vectors)} vectors but {len(contents)} documents")
+        self.vectors = vectors
+        self.contents = contents
+
+    @classmethod
+    def from_embeddings(cls, embeddings: list[list[float]], contents: list[str]) -> "LocalVectorIndex":
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(vectors / norms, list(contents))
+
+    @classmethod
+    def load(cls, prefix: Path = LOCAL_INDEX_PATH, mmap: bool = True) -> "LocalVectorIndex":
+        prefix = Path(prefix)
+        vectors = np.load(prefix.with_suffix(".npy"), mmap_mode="r" if mmap else None)
+        with open(prefix.with_suffix(".json"), "r", encoding="utf-8") as file:
+            contents = json.load(file)
+        return cls(vectors, contents)
+
+    def save(self, prefix: Path = LOCAL_INDEX_PATH):
+        prefix = Path(prefix)
+        # Workers keep the old .npy memory-mapped; truncating it in place
+        # would crash them on their next search
+        atomic_write(prefix.with_suffix(".npy"),
+                     lambda file: np.save(file, np.ascontiguousarray(self.vectors, dtype=np.float32)))
+        atomic_write(prefix.with_suffix(".json"),
+                     lambda file: json.dump(self.contents, file, ensure_ascii=False), mode="w")
+
+    def search(self, query_embedding, k: int = 4) -> list[dict]:
+        """Return the `k` most similar documents as `{"content", "similarity"}` rows."""
+        if len(self.contents) == 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [{"content": self.contents[i], "similarity": float(scores[i])} for i in top]
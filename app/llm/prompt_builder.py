@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+import time
+
+from app.llm.history_context import format_history_lines
+from app.metrics import record_prompt_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = "gpt-4o-mini"
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2500"))
+# Most of the variable budget goes to retrieved knowledge; history gets at most this share
+HISTORY_TOKEN_SHARE = float(os.getenv("HISTORY_TOKEN_SHARE", "0.3"))
+# Recent messages always given verbatim; older ones reach the prompt through
+# the conversation summary (see conversation_summary.py)
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "4"))
+# Seconds to wait before retrying a failed tiktoken load; tokens are estimated meanwhile
+TIKTOKEN_RETRY_INTERVAL = float(os.getenv("TIKTOKEN_RETRY_INTERVAL", "60"))
+
+# Rendered once per hotel and identical on every call for it, so it forms a
+# cacheable prompt prefix; all per-request content goes after it.
+SYSTEM_PROMPT_TEMPLATE = (
+    "Eres {assistant}, el asistente virtual oficial del {name}, un hotel ubicado en {location}.\n\n"
+
+    "TU MISIÓN:\n"
+    "- Proporcionar respuestas completas, útiles y amigables sobre el hotel.\n"
+    "- Usar toda la información disponible para resolver dudas por completo.\n"
+    "- Elaborar respuestas detalladas combinando múltiples datos cuando sea relevante.\n"
+    "- Anticipar preguntas relacionadas y ofrecer información adicional útil.\n\n"
+
+    "REGLAS IMPORTANTES:\n"
+    "- Responde SOLO usando la información proporcionada del hotel.\n"
+    "- NO inventes servicios, horarios, precios ni información que no esté en el conocimiento.\n"
+    "- Puedes combinar, reformular y elaborar sobre la información existente.\n"
+    "- Da respuestas completas y estructuradas (usa emojis, saltos de línea, listas).\n"
+    "- SOLO deriva a recepción si: 1) No hay información relevante, 2) Se pide hablar con humano, 3) Se requiere acción (reserva, cambio).\n"
+    "- Si hay información parcial, da lo que sabes y sugiere recepción solo para detalles específicos.\n\n"
+
+    "ESTILO DE RESPUESTA:\n"
+    "- Amigable, profesional y cercano.\n"
+    "- Usa emojis relevantes para hacer las respuestas más atractivas.\n"
+    "- Estructura la información con saltos de línea y vietas cuando sea apropiado.\n"
+    "- Sé conciso pero completo - no omitas detalles útiles.\n\n"
+
+    "El conocimiento del hotel y el contexto de la conversación se indican a continuación."
+)
+STATIC_SYSTEM_PROMPT = SYSTEM_PROMPT_TEMPLATE.format(
+    assistant="Costy", name="Hotel Costa Azul", location="Cádiz, España"
+)
+COUNTRY_NAMES = {"ES": "España", "PT": "Portugal", "FR": "Francia", "IT": "Italia"}
+
+
+def render_system_prompt(info: dict) -> str:
+    address = info.get("address", {})
+    country = address.get("country")
+    location = ", ".join(filter(None, [address.get("city"), COUNTRY_NAMES.get(country, country)]))
+    return SYSTEM_PROMPT_TEMPLATE.format(
+        assistant=info["hotel"].get("assistant_name", "Costy"),
+        name=info["hotel"]["name"],
+        location=location or "España",
+    )
+
+
+_encoding_cache = None
+_encoding_failed_at: float | None = None
+_encoding_lock = threading.Lock()
+
+
+def _encoding():
+    """The model's tiktoken encoding, or None while it can't be loaded.
+
+    The BPE file is downloaded on first use; a failure doesn't fail the chat
+    and is retried after TIKTOKEN_RETRY_INTERVAL, so a transient network
+    error doesn't leave the worker estimating tokens until it restarts.
+    """
+    global _encoding_cache, _encoding_failed_at
+    if _encoding_cache is not None:
+        return _encoding_cache
+    if _encoding_failed_at is not None and time.monotonic() - _encoding_failed_at < TIKTOKEN_RETRY_INTERVAL:
+        return None
+    if not _encoding_lock.acquire(blocking=False):
+        # Another thread is loading it
+        return None
+    try:
+        import tiktoken
+        _encoding_cache = tiktoken.encoding_for_model(LLM_MODEL)
+        _encoding_failed_at = None
+    except Exception as e:
+        _encoding_failed_at = time.monotonic()
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+    finally:
+        _encoding_lock.release()
+    return _encoding_cache
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def _fit(chunks: list[str], budget: int) -> tuple[list[str], int]:
+    """Keep chunks in order while they fit in `budget` tokens."""
+    kept = []
+    used = 0
+    for chunk in chunks:
+        tokens = count_tokens(chunk) + 1  # newline separator
+        if used + tokens > budget:
+            break
+        kept.append(chunk)
+        used += tokens
+    return kept, used
+
+
+def build_prompt(
+    user_message: str,
+    knowledge: str,
+    history: list,
+    system_prompt: str = STATIC_SYSTEM_PROMPT,
+    summary: str | None = None
+) -> list:
+    """Assemble the fallback prompt under PROMPT_TOKEN_BUDGET.
+
+    Retrieved chunks arrive most relevant first and are trimmed from the end.
+    `history` holds the messages the caller selected (those `summary`
+    doesn't cover). The conversation gets the history share of the budget:
+    the running summary first (dropped if it doesn't fit), then the
+    messages, trimmed oldest first.
+    """
+    static_tokens = count_tokens(system_prompt)
+    user_tokens = count_tokens(user_message)
+    available = max(0, PROMPT_TOKEN_BUDGET - static_tokens - user_tokens)
+    history_budget = int(available * HISTORY_TOKEN_SHARE)
+
+    kept_summary, summary_tokens = _fit([summary] if summary else [], history_budget)
+
+    history_lines = format_history_lines(history, len(history))
+    kept_history, history_tokens = _fit(history_lines[::-1], history_budget - summary_tokens)
+    kept_history.reverse()
+    history_tokens += summary_tokens
+
+    chunks = [c for c in knowledge.split("\n") if c.strip()]
+    kept_chunks, knowledge_tokens = _fit(chunks, available - history_tokens)
+
+    context = (
+        "CONOCIMIENTO DEL HOTEL (usa toda esta información para responder):\n"
+        + "\n".join(kept_chunks)
+    )
+    if kept_summary:
+        context += "\n\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n" + kept_summary[0]
+    context += "\n\nCONTEXTO DE LA CONVERSACIÓN (reciente):\n" + "\n".join(kept_history)
+
+    total = static_tokens + knowledge_tokens + history_tokens + user_tokens
+    record_prompt_tokens({
+        "static": static_tokens,
+        "knowledge": knowledge_tokens,
+        "history": history_tokens,
+        "user": user_tokens,
+        "total": total,
+    })
+    logger.debug(
+        f"Prompt tokens: static={static_tokens} knowledge={knowledge_tokens} "
+        f"({len(kept_chunks)}/{len(chunks)} chunks) history={history_tokens} "
+        f"({len(kept_history)}/{len(history_lines)} messages, summary={summary_tokens}) user={user_tokens} "
+        f"total~{total}"
+    )
+
+    from langchain.messages import SystemMessage, HumanMessage
+
+    return [
+        SystemMessage(content=system_prompt),
+        SystemMessage(content=context),
+        HumanMessage(content=user_message)
+    ]
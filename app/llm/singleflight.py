@@ -0,0 +1,46 @@
+import asyncio
+
+# Every SingleFlight by name, for stats reporting
+FLIGHTS: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller starts the computation as its own task; callers that
+    arrive with the same key while it is in flight await that task instead
+    of starting another. The task is shielded, so a caller that goes away
+    (e.g. a client disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[object, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+        FLIGHTS[name] = self
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"upstream_calls": self.calls, "coalesced": self.shared, "in_flight": len(self._inflight)}
+
+
+def singleflight_stats() -> dict:
+    return {name: flight.stats() for name, flight in FLIGHTS.items()}
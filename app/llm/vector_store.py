@@ -1,36 +1,176 @@
-from app.core.config.supabase_client import supabase
-from langchain_openai import OpenAIEmbeddings
+import os
+from app.core.config.supabase_client import get_supabase, get_async_supabase
+from app.core.config.http_clients import get_http_client, get_async_http_client, upstream_retry, HTTP_TIMEOUT
+from app.llm.local_index import RETRIEVAL_BACKEND
+from app.llm.embedding_cache import embedding_cache
+from app.llm.singleflight import SingleFlight
+from app.llm.hybrid_search import HYBRID_CANDIDATES, fuse, lexical_confident, lexical_only
+from app.hotel_snapshot import get_hotel_snapshot
+from app.metrics import RETRIEVALS, count
+from app.utils.text_utils import normalize_text
+import numpy as np
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# Upper bound on retrieved documents; the relevance cutoff usually keeps fewer
+RETRIEVAL_MAX_DOCS = int(os.getenv("RETRIEVAL_MAX_DOCS", "6"))
+# Texts per embeddings request when warming the cache in bulk
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
 
-def retrieve_relevant_context(query: str, k: int = 4) -> str:
-    query_embedding = embeddings.embed_query(query)
+EMBEDDING_MODEL = "text-embedding-3-small"
 
-    response = supabase.rpc(
-        "match_hotel_knowledge",
-        {
-            "query_embedding": query_embedding,
-            "match_count": k
-        }
-    ).execute()
+_embeddings = None
 
-    data = response.data
+_embed_flight = SingleFlight("embed")
+_retrieve_flight = SingleFlight("retrieve")
 
-    if data is None:
-        return ""
 
-    if isinstance(data, dict):
-        rows = [data]
-    elif isinstance(data, (list, tuple)):
-        rows = list(data)
+def get_embeddings():
+    """Return the shared OpenAI embeddings client, creating it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+        _embeddings = OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            request_timeout=HTTP_TIMEOUT,
+            max_retries=0,
+            # Queries are capped at 1000 characters, far below the model's
+            # context, so skip tokenizing them client-side with tiktoken
+            check_embedding_ctx_length=False
+        )
+    return _embeddings
+
+
+def embed_query(query: str) -> np.ndarray:
+    key = normalize_text(query)
+    vector = embedding_cache.get(key)
+    if vector is None:
+        vector = embedding_cache.put(key, _embed(query))
+    return vector
+
+
+async def aembed_query(query: str) -> np.ndarray:
+    key = normalize_text(query)
+    vector = await embedding_cache.aget(key)
+    if vector is None:
+        vector = await _embed_flight.do(key, lambda: _aembed_and_cache(key, query))
+    return vector
+
+
+async def aembed_queries(queries: list[str]) -> int:
+    """Embed the uncached queries in batched requests and cache them.
+
+    Later `aembed_query` calls for these queries are cache hits. Returns
+    how many queries were embedded.
+    """
+    missing = {}
+    for query in queries:
+        key = normalize_text(query)
+        if key not in missing and await embedding_cache.aget(key) is None:
+            missing[key] = query
+
+    keys = list(missing)
+    for start in range(0, len(keys), EMBED_BATCH_SIZE):
+        batch = keys[start:start + EMBED_BATCH_SIZE]
+        vectors = await _aembed_many([missing[k] for k in batch])
+        for key, vector in zip(batch, vectors):
+            await embedding_cache.aput(key, vector)
+    return len(keys)
+
+
+async def _aembed_and_cache(key: str, query: str) -> np.ndarray:
+    return await embedding_cache.aput(key, await _aembed(query))
+
+
+@upstream_retry
+def _embed(query: str) -> list[float]:
+    return get_embeddings().embed_query(query)
+
+
+@upstream_retry
+async def _aembed(query: str) -> list[float]:
+    return await get_embeddings().aembed_query(query)
+
+
+def _match_params(query_embedding, k: int, hotel_id: str) -> dict:
+    # Only the hotel's own rows are searched (see DEPLOYMENT.md)
+    return {
+        "query_embedding": np.asarray(query_embedding).tolist(),
+        "match_count": k,
+        "filter_hotel_id": hotel_id
+    }
+
+
+@upstream_retry
+async def _aembed_many(texts: list[str]) -> list[list[float]]:
+    return await get_embeddings().aembed_documents(texts)
+
+
+@upstream_retry
+def _match_documents(query_embedding, k: int, hotel_id: str):
+    return get_supabase().rpc("match_hotel_knowledge", _match_params(query_embedding, k, hotel_id)).execute()
+
+
+@upstream_retry
+async def _amatch_documents(query_embedding, k: int, hotel_id: str):
+    client = await get_async_supabase()
+    return await client.rpc("match_hotel_knowledge", _match_params(query_embedding, k, hotel_id)).execute()
+
+
+def retrieve_relevant_context(query: str, k: int = RETRIEVAL_MAX_DOCS, hotel_id: str | None = None) -> str:
+    snapshot = get_hotel_snapshot(hotel_id)
+    hits = snapshot.lexical_index.search(query, HYBRID_CANDIDATES)
+    if lexical_confident(hits):
+        count(RETRIEVALS, "lexical")
+        return "\n".join(lexical_only(hits, k))
+
+    query_embedding = embed_query(query)
+
+    if RETRIEVAL_BACKEND == "local":
+        rows = snapshot.vector_index.search(query_embedding, HYBRID_CANDIDATES)
+    else:
+        rows = _as_rows(_match_documents(query_embedding, HYBRID_CANDIDATES, snapshot.hotel_id).data)
+
+    count(RETRIEVALS, "hybrid")
+    return "\n".join(fuse(hits, rows, k))
+
+
+async def aretrieve_relevant_context(
+    query: str,
+    k: int = RETRIEVAL_MAX_DOCS,
+    query_embedding: np.ndarray | None = None,
+    hotel_id: str | None = None
+) -> str:
+    snapshot = get_hotel_snapshot(hotel_id)
+    # Same hotel and normalized query means the same embedding, so one RPC serves every waiter
+    return await _retrieve_flight.do(
+        (snapshot.hotel_id, normalize_text(query), k),
+        lambda: _aretrieve(query, k, query_embedding, snapshot)
+    )
+
+
+async def _aretrieve(query: str, k: int, query_embedding: np.ndarray | None, snapshot) -> str:
+    hits = snapshot.lexical_index.search(query, HYBRID_CANDIDATES)
+    if lexical_confident(hits):
+        # Short factual queries: the inverted index alone is enough
+        count(RETRIEVALS, "lexical")
+        return "\n".join(lexical_only(hits, k))
+
+    if query_embedding is None:
+        query_embedding = await aembed_query(query)
+
+    if RETRIEVAL_BACKEND == "local":
+        rows = snapshot.vector_index.search(query_embedding, HYBRID_CANDIDATES)
     else:
-        return ""
+        rows = _as_rows((await _amatch_documents(query_embedding, HYBRID_CANDIDATES, snapshot.hotel_id)).data)
 
-    contents = []
-    for row in rows:
-        if isinstance(row, dict):
-            content = row.get("content")
-            if content is not None:
-                contents.append(str(content))
+    count(RETRIEVALS, "hybrid")
+    return "\n".join(fuse(hits, rows, k))
 
-    return "\n".join(contents)
+
+def _as_rows(data) -> list[dict]:
+    if isinstance(data, dict):
+        return [data]
+    if isinstance(data, (list, tuple)):
+        return [row for row in data if isinstance(row, dict)]
+    return []
@@ -1,26 +1,88 @@
 from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from app.schemas import ChatRequest, ChatResponse
-from app.chat_service import process_message
-from app.data_loader import load_hotel_info
+from app.chat_service import aprocess_message, astream_message
+from app.llm.history_cache import history_cache
+from app.llm.conversation_summary import conversation_summaries
+from app.llm.answer_cache import answer_cache
+from app.llm.local_index import RETRIEVAL_BACKEND
+from app.llm.embedding_cache import embedding_cache, EMBEDDING_CACHE_PATH
+from app.llm.intent_router import intent_router
+from app.llm.singleflight import singleflight_stats
+from app.core.config.http_clients import aclose_http_clients, http_stats
+from app.core.config.shared_state import SHARED_STATE_URL
+from app.reindex_jobs import ReindexJobManager
+from app.warmup import warmup
+from app.batch_eval import EVAL_CONCURRENCY, EvalInputError, parse_jsonl, run_batch
+from app.metrics import ERRORS, REQUEST_SECONDS, SERVER_TIMING, start_timings, server_timing
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from app.hotel_snapshot import get_hotel_snapshot, hotels, reload_hotel_snapshot
+from app.data_loader import UnknownHotelError, hotel_info_path
+from app.ui_assets import UI_DIR, PrecompressedStaticFiles, ensure_ui_assets
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from datetime import datetime
-import subprocess
-import sys
+from contextlib import asynccontextmanager
+import logging
 import os
-from pathlib import Path
+import time
+import orjson
 
-# Rate limiter setup
-limiter = Limiter(key_func=get_remote_address)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Hotel Costa Azul Chatbot")
+
+def on_reindex_complete(hotel_id: str | None):
+    # Cached answers may be based on the knowledge that was just replaced
+    answer_cache.clear()
+    reload_hotel_snapshot(hotel_id)
+    intent_router.load()
+
+
+reindex_jobs = ReindexJobManager(on_complete=on_reindex_complete)
+
+# Rate limiter setup, counting in the store shared by all workers
+# (RATE_LIMIT_ENABLED=0 is meant for local load tests only)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=SHARED_STATE_URL,
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Other hotels are loaded on their first request
+    reload_hotel_snapshot()
+    if EMBEDDING_CACHE_PATH:
+        embedding_cache.load(EMBEDDING_CACHE_PATH)
+    intent_router.load()
+    await history_cache.start()
+    # Heavy clients load in the background; requests are served meanwhile
+    warmup.start()
+    yield
+    await warmup.stop()
+    await conversation_summaries.stop()
+    # Persist buffered chat messages before the worker exits
+    await history_cache.stop()
+    if EMBEDDING_CACHE_PATH:
+        embedding_cache.save(EMBEDDING_CACHE_PATH)
+    # Last, so the final history flush still has its connections
+    await aclose_http_clients()
+
+
+app = FastAPI(title="Hotel Costa Azul Chatbot", lifespan=lifespan, default_response_class=ORJSONResponse)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+
+@app.exception_handler(UnknownHotelError)
+async def unknown_hotel_handler(request: Request, exc: UnknownHotelError):
+    return ORJSONResponse(status_code=404, content={"detail": "Unknown hotel"})
+
 # Get allowed origins from environment or use default for development
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:*,http://127.0.0.1:*").split(",")
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
@@ -33,9 +95,16 @@ app.add_middleware(
     allow_headers=["Content-Type", "Authorization"],
 )
 
-# Mount static files for UI
-UI_DIR = Path(__file__).parent / "ui"
-app.mount("/ui", StaticFiles(directory=str(UI_DIR), html=True), name="ui")
+# Compress larger JSON bodies; precompressed assets and SSE are left alone
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=6)
+
+# Mount static files for UI, precompressed and content-hashed when built
+ui_manifest = ensure_ui_assets()
+if ui_manifest is not None:
+    app.mount("/ui", PrecompressedStaticFiles(manifest=ui_manifest, directory=str(UI_DIR), html=True), name="ui")
+else:
+    app.mount("/ui", StaticFiles(directory=str(UI_DIR), html=True), name="ui")
 
 
 @app.get("/robots.txt")
@@ -49,29 +118,56 @@ def robots_txt():
 @limiter.limit("30/minute")
 def root(request: Request):
     """Redirect root to UI."""
+    if ui_manifest is not None:
+        # The hashed page is cached for good; the redirect itself is not
+        return RedirectResponse(url=f"/ui/{ui_manifest['files']['index.html']}")
     return RedirectResponse(url="/ui/index.html")
 
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint for Render and monitoring."""
+    """Health check endpoint for Render and monitoring.
+
+    Always 200 once the worker is up; `status` is "warming" until the
+    background warm-up has created the upstream clients.
+    """
     return {
-        "status": "healthy",
+        "status": "ready" if warmup.ready else "warming",
+        "warmup": warmup.stats(),
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "answer_cache": answer_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "intent_router": intent_router.stats(),
+        "singleflight": singleflight_stats(),
+        "http": http_stats(),
+        "hotels": hotels.stats(),
+        "summaries": conversation_summaries.stats()
     }
 
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics for this worker."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/hotel-info")
 @limiter.limit("60/minute")
-def get_hotel_info(request: Request):
-    """Get complete hotel information."""
-    return load_hotel_info()
+def get_hotel_info(request: Request, hotel_id: str | None = None):
+    """Get complete hotel information (the default hotel unless `hotel_id` is given).
 
+    Served from the pre-serialized snapshot, with ETag revalidation.
+    """
+    snapshot = get_hotel_snapshot(hotel_id)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.json_bytes, media_type="application/json", headers=headers)
 
-@app.post("/chat", response_model=ChatResponse)
-@limiter.limit("20/minute")  # Prevent abuse - 20 messages per minute per IP
-def chat(request: Request, req: ChatRequest):
+
+def validate_chat_request(req: ChatRequest) -> str:
+    """Validate a chat request and return its sanitized session id."""
     # Input validation
     if not req.message or len(req.message.strip()) == 0:
         raise HTTPException(status_code=400, detail="Message cannot be empty")
@@ -83,70 +179,153 @@ def chat(request: Request, req: ChatRequest):
     session_id = req.session_id or "default"
     if len(session_id) > 100:
         raise HTTPException(status_code=400, detail="Session ID too long")
+
+    if req.after is not None and len(req.after) > 64:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+    # Loads the hotel on first use; raises UnknownHotelError (404) otherwise
+    get_hotel_snapshot(req.hotel_id)
+
+    return session_id
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode('utf-8')}\n\n"
+
+
+@app.post("/chat", response_model=ChatResponse)
+@limiter.limit("20/minute")  # Prevent abuse - 20 messages per minute per IP
+async def chat(request: Request, req: ChatRequest):
+    session_id = validate_chat_request(req)
     
+    started = time.perf_counter()
+    timings = start_timings()
     try:
-        reply, intent, history = process_message(
+        reply, intent, history = await aprocess_message(
             req.message.strip(),
-            session_id
+            session_id,
+            incremental=req.incremental,
+            after=req.after,
+            hotel_id=req.hotel_id
         )
 
-        return ChatResponse(
-            reply=reply,
-            intent=intent,
-            history=history
-        )
+        REQUEST_SECONDS.labels("chat").observe(time.perf_counter() - started)
+        headers = {"Server-Timing": server_timing(timings)} if SERVER_TIMING else None
+
+        # The history rows come from our own store, so they are serialized
+        # as is rather than re-validated through ChatResponse
+        return ORJSONResponse({
+            "reply": reply,
+            "intent": intent,
+            "history": history,
+            "cursor": history[-1]["created_at"] if history else None
+        }, headers=headers)
     except Exception as e:
-        # Log error (in production, use proper logging)
-        print(f"Error processing message: {e}")
+        ERRORS.labels("chat").inc()
+        logger.error(f"Error processing message: {e}")
         raise HTTPException(status_code=500, detail="Error processing message")
 
 
-@app.post("/reindex")
-@limiter.limit("3/hour")  # Very strict rate limit for admin endpoint
-def reindex_hotel_data(
-    request: Request,
-    x_api_key: str = Header(None)
-):
-    """Trigger re-indexing of hotel data into Supabase vector store.
-    
-    Requires ADMIN_API_KEY in header for security.
+@app.post("/chat/stream")
+@limiter.limit("20/minute")  # Same per-IP limit as /chat
+async def chat_stream(request: Request, req: ChatRequest):
+    """Chat over Server-Sent Events.
+
+    Keyword intents are sent as a single `message` event. LLM answers are
+    sent as `token` events while they are generated, followed by `done`.
     """
+    session_id = validate_chat_request(req)
+
+    async def events():
+        started = time.perf_counter()
+        try:
+            async for event, data in astream_message(req.message.strip(), session_id, req.hotel_id):
+                yield sse_event(event, data)
+            REQUEST_SECONDS.labels("chat_stream").observe(time.perf_counter() - started)
+        except Exception as e:
+            ERRORS.labels("chat_stream").inc()
+            logger.error(f"Error streaming message: {e}")
+            yield sse_event("error", {"detail": "Error processing message"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def require_admin_key(x_api_key: str | None):
     # Require API key for admin operations
     if ADMIN_API_KEY and x_api_key != ADMIN_API_KEY:
         raise HTTPException(
             status_code=403,
             detail="Invalid or missing API key"
         )
-    
+
+
+@app.post("/reindex", status_code=202)
+@limiter.limit("3/hour")  # Very strict rate limit for admin endpoint
+async def reindex_hotel_data(
+    request: Request,
+    hotel_id: str | None = None,
+    x_api_key: str = Header(None)
+):
+    """Start re-indexing one hotel's data (the default hotel unless
+    `hotel_id` is given) in the background.
+
+    Returns a job id right away; poll `GET /reindex/{job_id}` for progress.
+    A reindex of the same hotel already in progress, in any worker, is
+    returned instead of starting another.
+    Requires ADMIN_API_KEY in header for security.
+    """
+    require_admin_key(x_api_key)
+    if not hotel_info_path(hotel_id).exists():
+        raise UnknownHotelError(hotel_id)
+
+    job, created = await reindex_jobs.submit(local=RETRIEVAL_BACKEND == "local", hotel_id=hotel_id)
+    return {
+        "status": "accepted" if created else "already_running",
+        "job_id": job["job_id"],
+        "job": job
+    }
+
+
+@app.get("/reindex/{job_id}")
+async def reindex_status(job_id: str, x_api_key: str = Header(None)):
+    """Get the status and progress of a re-indexing job."""
+    require_admin_key(x_api_key)
+
+    job = await reindex_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown re-indexing job")
+    return job
+
+
+@app.post("/admin/eval")
+@limiter.limit("10/hour")
+async def batch_eval(
+    request: Request,
+    concurrency: int = EVAL_CONCURRENCY,
+    hotel_id: str | None = None,
+    x_api_key: str = Header(None)
+):
+    """Answer a JSONL batch of guest questions (the request body) through the
+    chat pipeline.
+
+    Streams one JSON line per question, with its reply, intent and timings,
+    in completion order. Requires ADMIN_API_KEY in header for security.
+    """
+    require_admin_key(x_api_key)
     try:
-        # Run the embeddings script
-        result = subprocess.run(
-            [sys.executable, "-m", "app.scripts.embeddings_test"],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        
-        if result.returncode == 0:
-            return {
-                "status": "success",
-                "message": "Hotel data re-indexed successfully",
-                "output": result.stdout
-            }
-        else:
-            return {
-                "status": "error",
-                "message": "Re-indexing failed",
-                "error": result.stderr
-            }
-    except subprocess.TimeoutExpired:
-        return {
-            "status": "error",
-            "message": "Re-indexing timed out"
-        }
-    except Exception as e:
-        print(f"Re-indexing error: {e}")
-        return {
-            "status": "error",
-            "message": str(e)
-        }
+        items = parse_jsonl(await request.body())
+    except EvalInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if hotel_id is not None:
+        get_hotel_snapshot(hotel_id)
+
+    async def lines():
+        async for result in run_batch(items, concurrency, hotel_id):
+            yield orjson.dumps(result) + b"\n"
+
+    # GZipMiddleware would buffer the lines until the end; "identity" makes it pass them through
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity"})
@@ -0,0 +1,162 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.config.http_clients import http_stats
+from app.llm.answer_cache import answer_cache
+from app.llm.embedding_cache import embedding_cache
+from app.llm.intent_router import intent_router
+from app.llm.singleflight import singleflight_stats
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+STAGE_SECONDS = Histogram(
+    "chat_stage_seconds",
+    "Time spent in each stage of the chat pipeline",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_SECONDS = Histogram(
+    "chat_request_seconds",
+    "End-to-end chat request time",
+    ["endpoint"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+INTENTS = Counter(
+    "chat_intent",
+    "Answered messages by intent and by what produced the reply",
+    ["intent", "source"],
+)
+RETRIEVALS = Counter(
+    "retrieval",
+    "Knowledge retrievals by how they were answered",
+    ["mode"],
+)
+ERRORS = Counter("chat_errors", "Chat requests that failed", ["endpoint"])
+LLM_TOKENS = Counter("llm_tokens", "Tokens reported by the OpenAI API", ["type"])
+PROMPT_TOKENS = Histogram(
+    "prompt_tokens",
+    "Estimated tokens of each fallback prompt, by part",
+    ["part"],
+    buckets=(25, 50, 100, 250, 500, 750, 1000, 1500, 2000, 2500, 3000, 4000),
+)
+
+_timings: ContextVar[dict | None] = ContextVar("chat_stage_timings", default=None)
+_observed: ContextVar[bool] = ContextVar("chat_metrics_observed", default=True)
+
+
+def start_timings(observe: bool = True) -> dict:
+    """Collect the stage timings of the current request into a fresh dict.
+
+    With `observe=False` (evaluation runs) the request's stages and counts
+    are kept out of the production metrics; timings are still collected.
+    """
+    timings = {}
+    _timings.set(timings)
+    _observed.set(observe)
+    return timings
+
+
+def count(counter: Counter, *labels: str):
+    """Increment `counter` for `labels`, unless the request is not observed."""
+    if _observed.get():
+        counter.labels(*labels).inc()
+
+
+def record_stage(name: str, seconds: float):
+    if _observed.get():
+        STAGE_SECONDS.labels(name).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+async def timed(name: str, awaitable):
+    """Await `awaitable` as stage `name`; usable inside asyncio.gather."""
+    with stage(name):
+        return await awaitable
+
+
+def record_token_usage(message):
+    """Count tokens from a LangChain message's `usage_metadata`, if present."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    LLM_TOKENS.labels("input").inc(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels("output").inc(usage.get("output_tokens", 0))
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    if cached:
+        LLM_TOKENS.labels("cached_input").inc(cached)
+
+
+def record_prompt_tokens(parts: dict):
+    """Observe the estimated token count of each part of a prompt."""
+    if _observed.get():
+        for part, tokens in parts.items():
+            PROMPT_TOKENS.labels(part).observe(tokens)
+
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+class CacheCollector:
+    """Exposes the in-process cache and upstream counters at scrape time."""
+
+    def collect(self):
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        hit_rate = GaugeMetricFamily("cache_hit_rate", "Share of lookups served from the cache", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries held in the cache", labels=["cache"])
+        for name, stats in (("answer", answer_cache.stats()), ("embedding", embedding_cache.stats())):
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            hit_rate.add_metric([name], stats["hit_rate"])
+            entries.add_metric([name], stats["entries"])
+        yield hits
+        yield misses
+        yield hit_rate
+        yield entries
+
+        saved = CounterMetricFamily("answer_cache_saved_seconds", "LLM time avoided by answer cache hits")
+        saved.add_metric([], answer_cache.stats()["saved_seconds"])
+        yield saved
+
+        router = intent_router.stats()
+        routed = CounterMetricFamily("intent_router_decisions", "Embedding router decisions", labels=["intent"])
+        for intent, count in router["routed"].items():
+            routed.add_metric([intent], count)
+        routed.add_metric(["llm"], router["passed_to_llm"])
+        yield routed
+
+        calls = CounterMetricFamily("singleflight_upstream_calls", "Calls that reached the upstream", labels=["flight"])
+        shared = CounterMetricFamily("singleflight_coalesced", "Calls served by an in-flight call", labels=["flight"])
+        for name, stats in singleflight_stats().items():
+            calls.add_metric([name], stats["upstream_calls"])
+            shared.add_metric([name], stats["coalesced"])
+        yield calls
+        yield shared
+
+        requests = CounterMetricFamily("http_client_requests", "Outbound HTTP requests", labels=["client"])
+        opened = CounterMetricFamily("http_client_connections_opened", "Outbound TCP connections opened", labels=["client"])
+        for name, stats in http_stats().items():
+            requests.add_metric([name], stats["requests"])
+            opened.add_metric([name], stats["connections_opened"])
+        yield requests
+        yield opened
+
+
+REGISTRY.register(CacheCollector())
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from app.core.config.shared_state import get_shared_store, offload
+from app.data_loader import resolve_hotel_id
+
+logger = logging.getLogger(__name__)
+
+MAX_FINISHED_JOBS = 20
+# Longest a reindex may hold its hotel before another worker can start one
+# (a worker that died mid-job releases it this way)
+REINDEX_CLAIM_TTL = float(os.getenv("REINDEX_CLAIM_TTL", "3600"))
+# How long finished jobs stay visible to the other workers
+REINDEX_JOB_TTL = 24 * 3600
+
+
+class ReindexJobManager:
+    """Runs the indexing pipeline in a worker thread, one job per hotel at a time.
+
+    Submitting while a job for the same hotel is queued or running, in this
+    worker or another, returns that job instead of starting another; other
+    hotels get their own job. A claim in the shared store keeps two workers
+    from reindexing the same hotel, and job records are copied there on
+    every status change so any worker can report them. `on_complete(hotel_id)`
+    runs on the event loop after a successful job so in-process caches can
+    switch to the new index.
+    """
+
+    def __init__(self, on_complete=None):
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._active: dict[str, dict] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._on_complete = on_complete
+
+    async def submit(self, local: bool = False, hotel_id: str | None = None) -> tuple[dict, bool]:
+        """Start a reindex job. Returns the job and whether it is a new one."""
+        hotel_id = resolve_hotel_id(hotel_id)
+        if hotel_id in self._active:
+            return self._active[hotel_id], False
+
+        store = get_shared_store()
+        claimed = await offload(store, store.incr, f"reindex-claim:{hotel_id}", 1, REINDEX_CLAIM_TTL) == 1
+        if hotel_id in self._active:
+            # Submitted here while the claim was being taken
+            return self._active[hotel_id], False
+        if not claimed:
+            owner = await offload(store, store.get, f"reindex-owner:{hotel_id}")
+            job = await self.get(owner.decode()) if owner else None
+            # None only in the moment before the claiming worker records its job
+            return job or {"job_id": None, "hotel_id": hotel_id, "status": "queued"}, False
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "hotel_id": hotel_id,
+            "status": "queued",
+            "progress": {"embedded": 0, "to_embed": None},
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        self._jobs[job["job_id"]] = job
+        self._active[hotel_id] = job
+        self._trim()
+        await offload(store, store.set, f"reindex-owner:{hotel_id}", job["job_id"].encode(), REINDEX_CLAIM_TTL)
+        await self._publish(job)
+
+        task = asyncio.create_task(self._run(job, local, hotel_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    async def get(self, job_id: str) -> dict | None:
+        """A job of this worker (with live progress) or, failing that, the
+        last status another worker recorded for it."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        store = get_shared_store()
+        data = await offload(store, store.get, f"reindex-job:{job_id}")
+        return None if data is None else json.loads(data)
+
+    async def _publish(self, job: dict):
+        store = get_shared_store()
+        try:
+            await offload(store, store.set, f"reindex-job:{job['job_id']}", json.dumps(job).encode("utf-8"), REINDEX_JOB_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to share reindex job {job['job_id']}: {e}")
+
+    async def _run(self, job: dict, local: bool, hotel_id: str):
+        loop = asyncio.get_running_loop()
+
+        def progress(done: int, total: int):
+            # Called from the worker thread
+            loop.call_soon_threadsafe(job["progress"].update, {"embedded": done, "to_embed": total})
+
+        job["status"] = "running"
+        await self._publish(job)
+        try:
+            # Pulls in the indexing dependencies, only needed once a job runs
+            from app.scripts.embeddings_test import reindex
+            job["result"] = await asyncio.to_thread(reindex, local, progress, hotel_id)
+            if self._on_complete is not None:
+                self._on_complete(hotel_id)
+            job["status"] = "succeeded"
+        except Exception as e:
+            logger.error(f"Re-indexing hotel {hotel_id} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = datetime.now().isoformat()
+            del self._active[hotel_id]
+            await self._publish(job)
+            store = get_shared_store()
+            try:
+                await offload(store, store.delete, f"reindex-owner:{hotel_id}")
+                await offload(store, store.delete, f"reindex-claim:{hotel_id}")
+            except Exception as e:
+                # Released by REINDEX_CLAIM_TTL instead
+                logger.warning(f"Failed to release the reindex claim of {hotel_id}: {e}")
+
+    def _trim(self):
+        active = {j["job_id"] for j in self._active.values()}
+        finished = [j for j in self._jobs.values() if j["job_id"] not in active]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job["job_id"]]
@@ -1,63 +1,58 @@
-from app.data_loader import load_hotel_info
-
-hotel_info = load_hotel_info()
-
-def greeting_response():
+def greeting_response(hotel_info: dict) -> str:
     return (
         f"Hola 👋 Soy el asistente virtual del {hotel_info['hotel']['name']} 🏖️\n"
         "¿En qué puedo ayudarte?"
     )
 
-def horarios_response():
+def horarios_response(hotel_info: dict) -> str:
     h = hotel_info["hotel"]
     hours = hotel_info.get("hours", {})
-    response = (
-        f"📅 Check-in: desde las {h['checkin']}\n"
-        f"📅 Check-out: hasta las {h['checkout']}\n\n"
-        f"🍳 Desayuno: {h['breakfast']}\n"
-    )
+    lines = [
+        f"📅 Check-in: desde las {h['checkin']}",
+        f"📅 Check-out: hasta las {h['checkout']}",
+        "",
+        f"🍳 Desayuno: {h['breakfast']}",
+    ]
     
     if hours:
-        response += "\n🕐 Horarios de servicios:\n"
+        lines.append("\n🕐 Horarios de servicios:")
         if "spa" in hours:
-            response += f"• Spa: {hours['spa']}\n"
+            lines.append(f"• Spa: {hours['spa']}")
         if "pool" in hours:
-            response += f"• Piscina: {hours['pool']}\n"
+            lines.append(f"• Piscina: {hours['pool']}")
         if "reception" in hours:
-            response += f"• Recepción: {hours['reception']}\n"
+            lines.append(f"• Recepción: {hours['reception']}")
     
-    return response
+    return "\n".join(lines) + "\n"
 
-def servicios_response():
-    services = "\n".join(f"✔️ {s}" for s in hotel_info["services"])
-    response = (
-        "Nuestros servicios principales:\n"
-        f"{services}\n\n"
-        f"📶 Wifi: {hotel_info['hotel']['wifi']}\n"
-        f"🚗 Parking: {hotel_info['hotel']['parking']}\n"
-    )
+def servicios_response(hotel_info: dict) -> str:
+    lines = ["Nuestros servicios principales:"]
+    lines.extend(f"✔️ {s}" for s in hotel_info["services"])
+    lines.append("")
+    lines.append(f"📶 Wifi: {hotel_info['hotel']['wifi']}")
+    lines.append(f"🚗 Parking: {hotel_info['hotel']['parking']}")
     
     # Add detailed amenities if available
     amenities = hotel_info.get("amenities", [])
     if amenities:
-        response += "\n🏊 Detalles de nuestros servicios:\n"
+        lines.append("\n🏊 Detalles de nuestros servicios:")
         for amenity in amenities:
-            response += f"• {amenity['name']}: {amenity.get('description', '')}\n"
+            lines.append(f"• {amenity['name']}: {amenity.get('description', '')}")
     
     # Add accessibility info
     accessibility = hotel_info.get("accessibility", {})
     if accessibility:
-        response += "\n♿ Accesibilidad:\n"
+        lines.append("\n♿ Accesibilidad:")
         if accessibility.get('elevator'):
-            response += "• Ascensor disponible\n"
+            lines.append("• Ascensor disponible")
         if accessibility.get('accessible_rooms'):
-            response += "• Habitaciones adaptadas\n"
+            lines.append("• Habitaciones adaptadas")
         if accessibility.get('ramp'):
-            response += "• Rampa de acceso\n"
+            lines.append("• Rampa de acceso")
     
-    return response
+    return "\n".join(lines) + "\n"
 
-def habitaciones_response():
+def habitaciones_response(hotel_info: dict) -> str:
     lines = []
     for room in hotel_info["rooms"]:
         desayuno = "con desayuno" if room["breakfast_included"] else "sin desayuno"
@@ -66,7 +61,7 @@ def habitaciones_response():
         )
     return "Disponemos de:\n" + "\n".join(lines)
 
-def recomendaciones_response():
+def recomendaciones_response(hotel_info: dict) -> str:
     places = "\n".join(f"🌴 {p}" for p in hotel_info["recommendations"]["places"])
     restaurants = "\n".join(
         f"🍽️ {r}" for r in hotel_info["recommendations"]["restaurants"]
@@ -78,25 +73,26 @@ def recomendaciones_response():
         f"{restaurants}"
     )
 
-def humano_response():
+def humano_response(hotel_info: dict) -> str:
     contact = hotel_info["contact"]
-    response = "📞 Te ponemos en contacto con recepción.\n\n"
+    lines = ["📞 Te ponemos en contacto con recepción.", ""]
     
     if "phone" in contact:
-        response += f"📱 Teléfono: {contact['phone']}\n"
+        lines.append(f"📱 Teléfono: {contact['phone']}")
     if "email" in contact:
-        response += f"📧 Email: {contact['email']}\n"
+        lines.append(f"📧 Email: {contact['email']}")
     
     hours = hotel_info.get("hours", {})
     if "reception" in hours:
-        response += f"\n🕐 Horario: {hours['reception']}\n"
+        lines.append(f"\n🕐 Horario: {hours['reception']}")
     
+    response = "\n".join(lines) + "\n"
     if "human_message" in contact:
         response += f"\n{contact['human_message']}"
     
     return response
 
-def fallback_response():
+def fallback_response(hotel_info: dict | None = None) -> str:
     return (
         "Lo siento 😅, no he entendido tu pregunta.\n\n"
         "Puedo ayudarte con:\n"
@@ -106,3 +102,19 @@ def fallback_response():
         "• Recomendaciones\n"
         "• Hablar con recepción"
     )
+
+
+INTENT_RESPONSES = {
+    "greeting": greeting_response,
+    "horarios": horarios_response,
+    "servicios": servicios_response,
+    "habitaciones": habitaciones_response,
+    "recomendaciones": recomendaciones_response,
+    "humano": humano_response,
+    "fallback": fallback_response,
+}
+
+
+def render_responses(hotel_info: dict) -> dict:
+    """Render every canned response for `hotel_info`, keyed by intent."""
+    return {intent: render(hotel_info) for intent, render in INTENT_RESPONSES.items()}
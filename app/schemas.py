@@ -4,9 +4,16 @@ from typing import Optional
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = 'default'
+    # Incremental mode returns only the messages after `after` (or just this
+    # turn) instead of the whole transcript
+    incremental: bool = False
+    after: Optional[str] = None
+    # Property to answer for; the default hotel when omitted
+    hotel_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     reply: str
     intent: str
     history: list | None = None
+    cursor: Optional[str] = None
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# The backends are mocked below, the clients only need to be constructible
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+# Single process, and no history or embeddings left over from earlier runs
+os.environ.setdefault("SHARED_STATE_URL", "memory://")
+
+from app import chat_service  # noqa: E402
+from app.llm import history_cache as history_cache_module  # noqa: E402
+from app.llm import conversation_summary as conversation_summary_module  # noqa: E402
+from app.llm.answer_cache import answer_cache  # noqa: E402
+
+QUESTIONS = [
+    ("Hola", False),
+    ("¿A qué hora es el check-in?", False),
+    ("¿Tenéis wifi?", False),
+    ("¿Qué habitaciones hay?", False),
+    ("¿Me recomiendas un restaurante?", False),
+    ("¿Se admiten perros?", True),
+    ("¿Hay cuna para bebés?", True),
+    ("¿Cómo llego desde la estación de tren?", True),
+]
+
+
+def install_mocks(db_ms: float, embed_ms: float, rpc_ms: float, llm_ms: float):
+    """Replace the Supabase/OpenAI calls used by chat_service with fixed-latency fakes."""
+    store: dict[str, list] = {}
+
+    def add_message(session_id, sender, message):
+        time.sleep(db_ms / 1000)
+        created_at = datetime.now(timezone.utc).isoformat()
+        store.setdefault(session_id, []).append({"sender": sender, "message": message, "created_at": created_at})
+
+    def get_history(session_id, limit=None):
+        time.sleep(db_ms / 1000)
+        return list(store.get(session_id, []))[-(limit or 0):]
+
+    def llm_fallback_answer(message, history, hotel_id=None, summary=None):
+        time.sleep((embed_ms + rpc_ms + llm_ms) / 1000)
+        return "respuesta"
+
+    async def aadd_messages(rows):
+        await asyncio.sleep(db_ms / 1000)
+        for row in rows:
+            store.setdefault(row["session_id"], []).append(
+                {"sender": row["sender"], "message": row["message"], "created_at": row["created_at"]}
+            )
+        return rows
+
+    async def atail(session_id, n):
+        await asyncio.sleep(db_ms / 1000)
+        return list(store.get(session_id, []))[-n:]
+
+    async def aembed_query(message):
+        await asyncio.sleep(embed_ms / 1000)
+        # Deterministic stand-in: identical questions get identical vectors
+        digest = hashlib.sha256(message.encode("utf-8")).digest()
+        return [b / 255 for b in digest]
+
+    async def aretrieve_relevant_context(message, query_embedding=None, hotel_id=None):
+        await asyncio.sleep(rpc_ms / 1000)
+        return "contexto"
+
+    async def allm_fallback_answer(message, history, knowledge=None, hotel_id=None, summary=None):
+        await asyncio.sleep(llm_ms / 1000)
+        return "respuesta"
+
+    async def asummarize(previous, rows):
+        await asyncio.sleep(llm_ms / 1000)
+        return "resumen"
+
+    chat_service.add_message = add_message
+    chat_service.get_history = get_history
+    chat_service.llm_fallback_answer = llm_fallback_answer
+    history_cache_module.aadd_messages = aadd_messages
+    history_cache_module.atail = atail
+    chat_service.aembed_query = aembed_query
+    chat_service.aretrieve_relevant_context = aretrieve_relevant_context
+    chat_service.allm_fallback_answer = allm_fallback_answer
+    conversation_summary_module._asummarize = asummarize
+
+
+def build_workload(n: int, fallback_ratio: float, seed: int = 42) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    keyword = [q for q, is_fallback in QUESTIONS if not is_fallback]
+    fallback = [q for q, is_fallback in QUESTIONS if is_fallback]
+    workload = []
+    for i in range(n):
+        pool = fallback if rng.random() < fallback_ratio else keyword
+        workload.append((rng.choice(pool), f"bench-{i % 50}"))
+    return workload
+
+
+def report(name: str, latencies: list[float], elapsed: float):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:<6} n={len(latencies):<5} p50={p50:8.1f} ms  p99={p99:8.1f} ms  rps={len(latencies) / elapsed:8.1f}")
+
+
+def run_sync(workload, threads: int):
+    # Mirrors FastAPI running a sync `def` endpoint on the anyio threadpool
+    def one(item):
+        start = time.perf_counter()
+        chat_service.process_message(*item)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, workload))
+    report("sync", latencies, time.perf_counter() - start)
+
+
+async def run_async(workload, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with sem:
+            start = time.perf_counter()
+            await chat_service.aprocess_message(*item)
+            return time.perf_counter() - start
+
+    await history_cache_module.history_cache.start()
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(item) for item in workload))
+    report("async", latencies, time.perf_counter() - start)
+    print(f"answer cache: {answer_cache.stats()}")
+    await conversation_summary_module.conversation_summaries.stop()
+    print(f"summaries: {conversation_summary_module.conversation_summaries.stats()}")
+    await history_cache_module.history_cache.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async /chat pipeline against mocked backends")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200, help="In-flight requests for the async path")
+    parser.add_argument("--threads", type=int, default=40, help="Threadpool size for the sync path (anyio default: 40)")
+    parser.add_argument("--fallback-ratio", type=float, default=0.4)
+    parser.add_argument("--db-ms", type=float, default=30)
+    parser.add_argument("--embed-ms", type=float, default=60)
+    parser.add_argument("--rpc-ms", type=float, default=40)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    install_mocks(args.db_ms, args.embed_ms, args.rpc_ms, args.llm_ms)
+    workload = build_workload(args.requests, args.fallback_ratio)
+
+    run_sync(workload, args.threads)
+    asyncio.run(run_async(workload, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
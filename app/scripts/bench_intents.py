@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from app.intents import classify_intent
+
+DATASET_PATH = Path(__file__).parent.parent / "data" / "guest_questions.jsonl"
+
+
+def legacy_detect_intent(message: str) -> str:
+    """The substring, first-match-wins classifier this replaced, for comparison."""
+    msg = message.lower()
+    if any(w in msg for w in ["hola", "buenas", "hello"]):
+        return "greeting"
+    if any(w in msg for w in ["check-in", "checkout", "horario", "desayuno"]):
+        return "horarios"
+    if any(w in msg for w in ["wifi", "parking", "piscina", "spa", "gimnasio"]):
+        return "servicios"
+    if any(w in msg for w in ["habitacion", "habitaciones", "suite", "precio"]):
+        return "habitaciones"
+    if any(w in msg for w in ["recomienda", "recomendación", "recomendaciones", "dónde comer", "cenar", "restaurante"]):
+        return "recomendaciones"
+    if any(w in msg for w in ["recepcion", "persona", "humano"]):
+        return "humano"
+    return "fallback"
+
+
+def load_dataset(path: Path) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def evaluate(name: str, classify, dataset: list[dict], rounds: int, verbose: bool):
+    correct = 0
+    keyword_hits = 0
+    for item in dataset:
+        predicted = classify(item["message"])
+        correct += predicted == item["intent"]
+        keyword_hits += predicted != "fallback"
+        if verbose and predicted != item["intent"]:
+            print(f"  [{name}] {item['message']!r}: expected {item['intent']}, got {predicted}")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in dataset:
+            classify(item["message"])
+    per_call = (time.perf_counter() - start) / (rounds * len(dataset)) * 1e6
+
+    print(f"{name:<8} accuracy={correct / len(dataset):6.1%}  keyword-path={keyword_hits / len(dataset):6.1%}  "
+          f"{per_call:6.1f} µs/classification")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and speed of the intent classifier on a labelled set")
+    parser.add_argument("--dataset", type=Path, default=DATASET_PATH, help="JSONL with message and intent fields")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="Print misclassified messages")
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    print(f"{len(dataset)} labelled messages\n")
+    evaluate("legacy", legacy_detect_intent, dataset, args.rounds, args.verbose)
+    evaluate("scored", lambda m: classify_intent(m).intent, dataset, args.rounds, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+from app.llm.intent_router import build_centroids, load_examples
+from app.scripts.bench_intents import DATASET_PATH, load_dataset
+from app.scripts.fake_upstreams import FakeEmbeddings, FakeUpstreams
+
+ROOT = Path(__file__).parent.parent.parent
+BASELINE_PATH = Path(__file__).parent.parent / "data" / "loadtest_baseline.json"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fakes(fakes: FakeUpstreams, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(fakes.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def start_app(port: int, fake_url: str, workdir: Path, history: str) -> subprocess.Popen:
+    """Run the real app under uvicorn, wired to the fake upstreams."""
+    centroids = workdir / "intents.npz"
+    build_centroids(load_examples(), FakeEmbeddings(), centroids)
+
+    env = {
+        **os.environ,
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_KEY": "loadtest.loadtest.loadtest",
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "OPENAI_API_BASE": f"{fake_url}/v1",
+        "RETRIEVAL_BACKEND": "supabase",
+        "INTENT_CENTROIDS_PATH": str(centroids),
+        "EMBEDDING_CACHE_PATH": "",
+        "RATE_LIMIT_ENABLED": "0",
+        # Fresh shared state per run, nothing cached from a previous one
+        "SHARED_STATE_URL": f"sqlite:///{workdir / 'state.sqlite3'}",
+        "CHAT_HISTORY_BACKEND": history,
+        "CHAT_HISTORY_PATH": str(workdir / "history.sqlite3"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).json().get("status") == "ready":
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not become ready")
+
+
+def build_sessions(questions: list[dict], requests: int, sessions: int, seed: int) -> list[list[str]]:
+    """Spread `requests` questions, sampled from the corpus, over `sessions` conversations."""
+    rng = random.Random(seed)
+    conversations = [[] for _ in range(sessions)]
+    for i in range(requests):
+        conversations[i % sessions].append(rng.choice(questions)["message"])
+    return conversations
+
+
+async def run_load(client: httpx.AsyncClient, conversations: list[list[str]], concurrency: int) -> tuple[list, float]:
+    sem = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def converse(index: int, messages: list[str]):
+        # One guest at a time per session, like a real conversation
+        async with sem:
+            for message in messages:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/chat", json={
+                        "message": message,
+                        "session_id": f"loadtest-{index}",
+                        "incremental": True,
+                    })
+                    ok = response.status_code == 200
+                    intent = response.json().get("intent") if ok else None
+                except httpx.HTTPError:
+                    ok, intent = False, None
+                results.append((time.perf_counter() - start, ok, intent))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(converse(i, m) for i, m in enumerate(conversations)))
+    return results, time.perf_counter() - start
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+def summarize(results: list, elapsed: float, upstream: dict) -> dict:
+    latencies = [r[0] * 1000 for r in results if r[1]]
+    by_intent: dict[str, list[float]] = {}
+    for seconds, ok, intent in results:
+        if ok:
+            by_intent.setdefault(intent, []).append(seconds * 1000)
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r[1]),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(results) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "by_intent": {
+            intent: {"count": len(v), "p50_ms": round(statistics.median(v), 1)}
+            for intent, v in sorted(by_intent.items())
+        },
+        "upstream": dict(sorted(upstream.items())),
+    }
+
+
+def median_result(runs: list[dict]) -> dict:
+    """Combine repeated runs into their per-metric medians, keeping each run's headline numbers."""
+    def median(values):
+        return round(statistics.median(values), 1)
+
+    intents = sorted({intent for run in runs for intent in run["by_intent"]})
+    upstream = sorted({name for run in runs for name in run["upstream"]})
+    return {
+        "requests": runs[0]["requests"],
+        "errors": sum(run["errors"] for run in runs),
+        "seconds": median([run["seconds"] for run in runs]),
+        **{key: median([run[key] for run in runs]) for key in ("rps", "p50_ms", "p95_ms", "p99_ms")},
+        "by_intent": {
+            intent: {
+                "count": runs[0]["by_intent"].get(intent, {}).get("count", 0),
+                "p50_ms": median([run["by_intent"][intent]["p50_ms"] for run in runs if intent in run["by_intent"]]),
+            }
+            for intent in intents
+        },
+        "upstream": {name: int(statistics.median([run["upstream"].get(name, 0) for run in runs])) for name in upstream},
+        "runs": [{key: run[key] for key in ("rps", "p50_ms", "p95_ms", "p99_ms")} for run in runs],
+    }
+
+
+def machine() -> dict:
+    """Where a result was measured; timings only compare on the same machine."""
+    return {"host": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version()}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(result: dict, baseline: dict, max_regression: float) -> bool:
+    """Print the change against `baseline`; False if it regressed beyond `max_regression`."""
+    if baseline["config"] != result["config"]:
+        print("baseline was recorded with a different config, not comparing")
+        return True
+    if baseline.get("machine") != result["machine"]:
+        print(f"baseline was recorded on another machine ({baseline.get('machine')}), not gating; "
+              f"record one here with --save first")
+        return True
+
+    regressed = False
+    for key, higher_is_better in (("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+        old, new = baseline[key], result[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        # A median still inside the baseline's own run-to-run spread is noise
+        spread = [run[key] for run in baseline.get("runs", [])] or [old]
+        worst = min(spread) if higher_is_better else max(spread)
+        outside = new < worst if higher_is_better else new > worst
+        flag = "  REGRESSION" if worse > max_regression and outside else ""
+        regressed |= bool(flag)
+        print(f"  {key:7} {old:9.1f} -> {new:9.1f} ({change:+.1%}, baseline runs {min(spread):.1f}-{max(spread):.1f}){flag}")
+
+    for name in sorted(set(baseline["upstream"]) | set(result["upstream"])):
+        old, new = baseline["upstream"].get(name, 0), result["upstream"].get(name, 0)
+        if old != new:
+            print(f"  upstream {name}: {old} -> {new}")
+    return not regressed
+
+
+async def bench_once(args) -> dict:
+    fakes = FakeUpstreams(args.db_ms, args.embed_ms, args.rpc_ms, args.llm_ms)
+    fake_port, app_port = free_port(), free_port()
+    fake_server = start_fakes(fakes, fake_port)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = start_app(app_port, f"http://127.0.0.1:{fake_port}", Path(workdir), args.history)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                fakes.calls.clear()
+                conversations = build_sessions(load_dataset(DATASET_PATH), args.requests, args.sessions, args.seed)
+                results, elapsed = await run_load(client, conversations, args.concurrency)
+        finally:
+            # Graceful stop so buffered history is flushed and counted
+            app.send_signal(signal.SIGINT)
+            app.wait(timeout=30)
+            fake_server.should_exit = True
+
+    return summarize(results, elapsed, fakes.calls)
+
+
+def bench(args) -> dict:
+    """Run the load `args.warmup + args.repeats` times, each against a fresh
+    app, and return the medians of the measured runs. Warm-up runs (cold
+    disk and import caches) are discarded."""
+    runs = []
+    for i in range(args.warmup + args.repeats):
+        run = asyncio.run(bench_once(args))
+        label = "warm-up" if i < args.warmup else f"run {i - args.warmup + 1}/{args.repeats}"
+        print(f"{label:9} {run['rps']:7.1f} rps  p50={run['p50_ms']} ms  p99={run['p99_ms']} ms  "
+              f"{run['errors']} errors")
+        if i >= args.warmup:
+            runs.append(run)
+    return median_result(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test /chat against fake Supabase/OpenAI upstreams and compare with the baseline"
+    )
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--sessions", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=40, help="Conversations in flight")
+    parser.add_argument("--db-ms", type=float, default=20)
+    parser.add_argument("--embed-ms", type=float, default=50)
+    parser.add_argument("--rpc-ms", type=float, default=30)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--history", choices=("supabase", "sqlite"), default="supabase",
+                        help="Chat history backend: the fake Supabase or a local SQLite file")
+    parser.add_argument("--repeats", type=int, default=5, help="Measured runs; their medians are compared")
+    parser.add_argument("--warmup", type=int, default=1, help="Discarded runs before the measured ones")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed relative slowdown of the medians vs. baseline")
+    parser.add_argument("--out", type=Path, help="Also write the result JSON here")
+    parser.add_argument("--save", action="store_true", help=f"Write the result to {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    config = {k: getattr(args, k) for k in ("requests", "sessions", "concurrency", "db_ms", "embed_ms", "rpc_ms", "llm_ms", "seed")}
+    if args.history != "supabase":
+        # Only recorded when set, so the existing baseline still compares
+        config["history"] = args.history
+    result = {"commit": git_commit(), "machine": machine(), "config": config, **bench(args)}
+
+    print(f"median of {len(result['runs'])} runs, {result['requests']} requests in {result['seconds']}s: {result['rps']} rps, "
+          f"p50={result['p50_ms']} ms p95={result['p95_ms']} ms p99={result['p99_ms']} ms, "
+          f"{result['errors']} errors")
+    for intent, stats in result["by_intent"].items():
+        print(f"  {intent:16} n={stats['count']:<5} p50={stats['p50_ms']} ms")
+    print(f"upstream calls: {result['upstream']}")
+
+    ok = True
+    if BASELINE_PATH.exists() and not args.save:
+        with open(BASELINE_PATH, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        print(f"vs. baseline ({baseline.get('commit')}):")
+        ok = compare(result, baseline, args.max_regression)
+
+    for path in filter(None, (args.out, BASELINE_PATH if args.save else None)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+            file.write("\n")
+        print(f"Saved result to {path}")
+
+    sys.exit(0 if ok and result["errors"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
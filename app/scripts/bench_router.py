@@ -0,0 +1,94 @@
+import argparse
+import tempfile
+from pathlib import Path
+
+from app.llm.intent_router import (
+    INTENT_ROUTER_MARGIN,
+    INTENT_ROUTER_THRESHOLD,
+    CentroidIntentRouter,
+    build_centroids,
+    load_examples,
+)
+from app.scripts.bench_intents import load_dataset
+
+DATASET_PATH = Path(__file__).parent.parent / "data" / "router_questions.jsonl"
+THRESHOLDS = [0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8]
+MARGINS = [0.0, 0.02, 0.05, 0.1]
+
+
+def evaluate(vectors, dataset: list[dict], centroids: Path, threshold: float, margin: float) -> dict:
+    router = CentroidIntentRouter(threshold, margin)
+    router.load(centroids)
+    routed = correct = wrong_fallback = 0
+    answerable = sum(1 for item in dataset if item["intent"] != "fallback")
+    mistakes = []
+    for item, vector in zip(dataset, vectors):
+        intent = router.route(vector)
+        if intent is None:
+            continue
+        routed += 1
+        correct += intent == item["intent"]
+        wrong_fallback += item["intent"] == "fallback"
+        if intent != item["intent"]:
+            mistakes.append((item["message"], item["intent"], intent))
+    return {
+        "routed": routed,
+        "precision": correct / routed if routed else None,
+        "coverage": correct / answerable if answerable else 0.0,
+        "wrong_fallback": wrong_fallback,
+        "mistakes": mistakes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precision of the embedding intent router on labelled keyword-less questions, "
+                    "per threshold and margin"
+    )
+    parser.add_argument("--dataset", type=Path, default=DATASET_PATH,
+                        help="JSONL with message and intent fields; fallback marks questions the templates do not answer")
+    parser.add_argument("--fake", action="store_true",
+                        help="Use the offline hashed embeddings; only checks the plumbing, scores are not meaningful")
+    parser.add_argument("--threshold", type=float, default=INTENT_ROUTER_THRESHOLD,
+                        help="Setting for --verbose; defaults to INTENT_ROUTER_THRESHOLD")
+    parser.add_argument("--margin", type=float, default=INTENT_ROUTER_MARGIN,
+                        help="Setting for --verbose; defaults to INTENT_ROUTER_MARGIN")
+    parser.add_argument("--verbose", action="store_true", help="Print wrongly routed questions at the chosen setting")
+    args = parser.parse_args()
+
+    if args.fake:
+        from app.scripts.fake_upstreams import FakeEmbeddings
+        emb = FakeEmbeddings()
+    else:
+        from app.llm.vector_store import get_embeddings
+        emb = get_embeddings()
+
+    dataset = load_dataset(args.dataset)
+    vectors = emb.embed_documents([item["message"] for item in dataset])
+    answerable = sum(1 for item in dataset if item["intent"] != "fallback")
+    print(f"{len(dataset)} labelled questions, {answerable} answerable by a template")
+    if INTENT_ROUTER_THRESHOLD is None:
+        print("The router is off in the app: INTENT_ROUTER_THRESHOLD is not set")
+    print()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        centroids = Path(workdir) / "intents.npz"
+        build_centroids(load_examples(), emb, centroids)
+
+        print("threshold  margin  routed  precision  coverage  fallback-routed")
+        for threshold in THRESHOLDS:
+            for margin in MARGINS:
+                result = evaluate(vectors, dataset, centroids, threshold, margin)
+                current = threshold == args.threshold and margin == args.margin
+                precision = f"{result['precision']:9.1%}" if result["precision"] is not None else f"{'-':>9}"
+                print(f"{threshold:9.2f}  {margin:6.2f}  {result['routed']:6}  {precision}  "
+                      f"{result['coverage']:8.1%}  {result['wrong_fallback']:15}{'  <- chosen' if current else ''}")
+
+        if args.verbose and args.threshold is not None:
+            result = evaluate(vectors, dataset, centroids, args.threshold, args.margin)
+            for message, expected, got in result["mistakes"]:
+                print(f"  {message!r}: expected {expected}, routed to {got}")
+
+
+if __name__ == "__main__":
+    main()
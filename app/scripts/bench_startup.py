@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.parent
+BASELINE_PATH = Path(__file__).parent.parent / "data" / "startup_importtime.json"
+
+# Must stay out of the import path of app.main; they load lazily or in the warm-up
+DEFERRED_MODULES = ["langchain_openai", "langchain", "openai", "supabase", "tiktoken"]
+
+
+def measure(module: str) -> tuple[dict[str, int], set[str]]:
+    """Import `module` in a fresh interpreter under -X importtime.
+
+    Returns cumulative microseconds for `module` and each of its direct
+    imports, and the set of all imported module names.
+    """
+    env = dict(os.environ)
+    # Importing must not need credentials; unset them to prove it
+    for name in ("SUPABASE_URL", "SUPABASE_KEY", "OPENAI_API_KEY"):
+        env.pop(name, None)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+    children: dict[str, int] = {}
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self |  cumulative | <indent>name", children are
+        # printed before their parent with 2 more spaces of indent
+        _, us_cumulative, name = line.split(":", 1)[1].split("|")
+        indent = len(name) - len(name.lstrip())
+        name = name.strip()
+        imported.add(name)
+        if indent == 1:
+            if name == module:
+                children[module] = int(us_cumulative)
+                break
+            children = {}
+        elif indent == 3:
+            children[name] = int(us_cumulative)
+    return children, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure `import app.main` time with python -X importtime")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--save", action="store_true", help=f"Write the result to {BASELINE_PATH.name}")
+    args = parser.parse_args()
+
+    totals = []
+    packages: dict[str, list[int]] = {}
+    imported = set()
+    for _ in range(args.runs):
+        cumulative, imported = measure(args.module)
+        totals.append(cumulative.pop(args.module))
+        for name, us in cumulative.items():
+            packages.setdefault(name, []).append(us)
+
+    total_ms = statistics.median(totals) / 1000
+    top = sorted(((statistics.median(v) / 1000, k) for k, v in packages.items()), reverse=True)[:args.top]
+
+    print(f"import {args.module}: median {total_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f})")
+    for ms, name in top:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    if BASELINE_PATH.exists():
+        with open(BASELINE_PATH, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        delta = total_ms - baseline["median_ms"]
+        print(f"baseline: {baseline['median_ms']:.1f} ms ({delta:+.1f} ms)")
+
+    eager = [m for m in DEFERRED_MODULES if m in imported]
+    if eager:
+        print(f"FAIL: imported at startup, should be lazy: {', '.join(eager)}")
+
+    if args.save:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+            json.dump({
+                "module": args.module,
+                "python": sys.version.split()[0],
+                "runs": args.runs,
+                "median_ms": round(total_ms, 1),
+                "top": [{"module": name, "ms": round(ms, 1)} for ms, name in top],
+            }, file, indent=2)
+            file.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    sys.exit(1 if eager else 0)
+
+
+if __name__ == "__main__":
+    main()
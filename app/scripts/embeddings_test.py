@@ -1,90 +1,26 @@
 import argparse
+import hashlib
 import sys
-from app.data_loader import load_hotel_info
+from app.data_loader import load_hotel_info, resolve_hotel_id
+from app.hotel_documents import build_documents
 from langchain_openai import OpenAIEmbeddings
+from app.llm.local_index import LocalVectorIndex, local_index_path
+from app.llm.intent_router import build_centroids, load_examples
+from app.core.config.http_clients import get_http_client, HTTP_TIMEOUT
 
 try:
-    from app.core.config.supabase_client import supabase
+    from app.core.config.supabase_client import get_supabase
+    supabase = get_supabase()
     supabase_import_error = None
 except Exception as e:
     supabase = None
     supabase_import_error = e
 
+BATCH_SIZE = 100
 
-def build_documents(info: dict) -> list:
-    docs = [
-        f"Wifi del hotel: {info['hotel']['wifi']}",
-        f"Parking: {info['hotel']['parking']}",
-        f"Check-in: {info['hotel']['checkin']}",
-        f"Check-out: {info['hotel']['checkout']}",
-    ]
 
-    for s in info.get("services", []):
-        docs.append(f"Servicio del hotel: {s}")
-
-    for r in info.get("rooms", []):
-        docs.append(f"Habitación {r['type']} para {r['capacity']} personas")
-
-    for a in info.get("general_activities", {}).get("rainy_day", []):
-        docs.append(f"Actividad en día de lluvia: {a}")
-
-    for a in info.get("general_activities", {}).get("with_kids", []):
-        docs.append(f"Actividad para niños: {a}")
-
-    if "address" in info:
-        addr = info["address"]
-        docs.append(f"Dirección: {addr.get('street', '')}, {addr.get('city', '')} {addr.get('postal_code', '')}, {addr.get('country', '')}")
-        docs.append(f"Coordenadas: lat {addr.get('lat')}, lng {addr.get('lng')}")
-
-    if "photos" in info:
-        for p in info["photos"]:
-            docs.append(f"Foto del hotel: {p}")
-
-    if "rating" in info:
-        docs.append(f"Valoración media: {info['rating'].get('average')}")
-        for rev in info['rating'].get('reviews', []):
-            docs.append(f"Reseña: {rev.get('user')} puntuación {rev.get('score')}: {rev.get('text')}")
-
-    if "policies" in info:
-        for k, v in info['policies'].items():
-            docs.append(f"Política {k}: {v}")
-
-    if "faqs" in info:
-        for f in info['faqs']:
-            docs.append(f"FAQ: {f.get('q')} - {f.get('a')}")
-
-    if "hours" in info:
-        for k, v in info['hours'].items():
-            docs.append(f"Horario {k}: {v}")
-
-    if "payment_methods" in info:
-        docs.append("Métodos de pago: " + ", ".join(info["payment_methods"]))
-
-    if "amenities" in info:
-        for a in info['amenities']:
-            docs.append(f"Amenidad: {a.get('name')} - {a.get('description', '')}")
-
-    if "accessibility" in info:
-        acc = info['accessibility']
-        acc_items = [k for k, v in acc.items() if v]
-        docs.append("Accesibilidad: " + ", ".join(acc_items))
-
-    if "transport" in info:
-        for k, v in info['transport'].items():
-            docs.append(f"Transporte {k}: {v}")
-
-    if "languages_spoken" in info:
-        docs.append("Idiomas hablados: " + ", ".join(info['languages_spoken']))
-
-    if "special_offers" in info:
-        for s in info['special_offers']:
-            docs.append(f"Oferta: {s.get('title')} - {s.get('description')} (validez: {s.get('valid_until')})")
-
-    return docs
-
-
-def main(dry_run: bool = False, compute_embeddings: bool = False):
-    info = load_hotel_info()
+def main(dry_run: bool = False, compute_embeddings: bool = False, local: bool = False, hotel_id: str | None = None):
+    info = load_hotel_info(hotel_id)
     documents = build_documents(info)
 
     if dry_run:
@@ -103,32 +39,157 @@ def main(dry_run: bool = False, compute_embeddings: bool = False):
                 print("Failed to compute embeddings (are API keys set?):", e)
         return
 
-    if supabase is None:
+    stats = reindex(
+        local=local,
+        progress=lambda done, total: print(f"Embedded {done}/{total} documents"),
+        hotel_id=hotel_id
+    )
+
+    if local:
+        print(f"Done. Wrote {stats['total']} documents to {local_index_path(hotel_id)}.npy/.json "
+              f"({stats['embedded']} embedded, {stats['unchanged']} unchanged)")
+    else:
+        print(f"Done. {stats['embedded']} embedded, {stats['unchanged']} unchanged, "
+              f"{stats['deleted']} stale rows deleted ({stats['total']} documents).")
+
+
+def reindex(local: bool = False, progress=None, hotel_id: str | None = None) -> dict:
+    """Index one hotel's current hotel_info.json and return the index stats.
+
+    `progress(done, total)` is called after each embedded batch.
+    """
+    hotel_id = resolve_hotel_id(hotel_id)
+    documents = build_documents(load_hotel_info(hotel_id))
+    emb = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        http_client=get_http_client(),
+        request_timeout=HTTP_TIMEOUT
+    )
+
+    if local:
+        stats = index_local(documents, emb, progress, hotel_id)
+    elif supabase is None:
         raise RuntimeError(f"Supabase client not available: {supabase_import_error}")
+    else:
+        stats = index_supabase(documents, emb, progress, hotel_id)
+
+    # Intent centroids for the embedding router (used once INTENT_ROUTER_THRESHOLD
+    # is set) are stored with the index
+    stats["intent_centroids_rebuilt"] = build_centroids(load_examples(), emb)
+    return stats
+
+
+def content_hash(doc: str) -> str:
+    return hashlib.sha256(doc.encode("utf-8")).hexdigest()
+
+
+def _batches(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_stored_hashes(hotel_id: str) -> set:
+    hashes = set()
+    start = 0
+    while True:
+        rows = (
+            supabase.table("hotel_knowledge")
+            .select("content_hash")
+            .eq("hotel_id", hotel_id)
+            .range(start, start + 999)
+            .execute()
+        ).data or []
+        hashes.update(r["content_hash"] for r in rows)
+        if len(rows) < 1000:
+            return hashes
+        start += 1000
+
+
+def index_supabase(documents: list, emb: OpenAIEmbeddings, progress=None, hotel_id: str | None = None) -> dict:
+    """Sync `documents` into the hotel's hotel_knowledge rows, keyed by
+    (hotel_id, content hash).
+
+    Only documents whose hash is not stored yet are embedded (in batched
+    `embed_documents` calls) and upserted; rows whose content no longer
+    exists, or that predate content hashes, are deleted.
+    """
+    hotel_id = resolve_hotel_id(hotel_id)
+    docs_by_hash = {content_hash(d): d for d in documents}
+    stored = fetch_stored_hashes(hotel_id)
+
+    new = [h for h in docs_by_hash if h not in stored]
+    stale = [h for h in stored if h is not None and h not in docs_by_hash]
+
+    for i, batch in enumerate(_batches(new, BATCH_SIZE)):
+        vectors = emb.embed_documents([docs_by_hash[h] for h in batch])
+        supabase.table("hotel_knowledge").upsert(
+            [
+                {"hotel_id": hotel_id, "content": docs_by_hash[h], "content_hash": h, "embedding": v}
+                for h, v in zip(batch, vectors)
+            ],
+            on_conflict="hotel_id,content_hash"
+        ).execute()
+        if progress:
+            progress(min((i + 1) * BATCH_SIZE, len(new)), len(new))
+
+    for batch in _batches(stale, BATCH_SIZE):
+        supabase.table("hotel_knowledge").delete().eq("hotel_id", hotel_id).in_("content_hash", batch).execute()
+
+    deleted = len(stale)
+    if None in stored:
+        legacy = (
+            supabase.table("hotel_knowledge").delete()
+            .eq("hotel_id", hotel_id).is_("content_hash", "null").execute()
+        )
+        deleted += len(legacy.data or [])
+
+    return {
+        "total": len(docs_by_hash),
+        "embedded": len(new),
+        "unchanged": len(docs_by_hash) - len(new),
+        "deleted": deleted,
+    }
+
+
+def index_local(documents: list, emb: OpenAIEmbeddings, progress=None, hotel_id: str | None = None) -> dict:
+    """Rebuild the hotel's local index, reusing the vectors of unchanged documents."""
+    path = local_index_path(hotel_id)
+    contents = list(dict.fromkeys(documents))
+
+    known = {}
+    try:
+        previous = LocalVectorIndex.load(path, mmap=False)
+        known = {c: v for c, v in zip(previous.contents, previous.vectors)}
+    except FileNotFoundError:
+        pass
 
-    emb = OpenAIEmbeddings(model="text-embedding-3-small")
+    missing = [c for c in contents if c not in known]
+    for i, batch in enumerate(_batches(missing, BATCH_SIZE)):
+        known.update(zip(batch, emb.embed_documents(batch)))
+        if progress:
+            progress(min((i + 1) * BATCH_SIZE, len(missing)), len(missing))
 
-    insert_count = 0
-    for doc in documents:
-        vec = emb.embed_query(doc)
-        supabase.table("hotel_knowledge").insert({
-            "content": doc,
-            "embedding": vec
-        }).execute()
-        insert_count += 1
-        print(f"Inserted {insert_count}: {doc[:80]}")
+    index = LocalVectorIndex.from_embeddings([known[c] for c in contents], contents)
+    index.save(path)
 
-    print(f"Done. Inserted {insert_count} documents into Supabase.")
+    return {
+        "total": len(contents),
+        "embedded": len(missing),
+        "unchanged": len(contents) - len(missing),
+        "deleted": len(set(known) - set(contents)),
+    }
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Index hotel info into Supabase (or dry-run)")
     parser.add_argument("--dry-run", action="store_true", help="Print documents without inserting to Supabase")
     parser.add_argument("--compute-embeddings", action="store_true", help="Compute embeddings during dry-run (may require API keys)")
+    parser.add_argument("--local", action="store_true", help="Write a local vector index file instead of inserting to Supabase")
+    parser.add_argument("--hotel", help="Hotel id to index (default: DEFAULT_HOTEL_ID)")
     args = parser.parse_args()
 
     try:
-        main(dry_run=args.dry_run, compute_embeddings=args.compute_embeddings)
+        main(dry_run=args.dry_run, compute_embeddings=args.compute_embeddings, local=args.local, hotel_id=args.hotel)
     except Exception as e:
         print("Error:", e, file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import orjson
+
+from app.batch_eval import EVAL_CONCURRENCY, EvalInputError, parse_jsonl, run_batch, summarize
+from app.core.config.http_clients import aclose_http_clients
+from app.hotel_snapshot import reload_hotel_snapshot
+from app.llm.conversation_summary import conversation_summaries
+from app.llm.history_cache import history_cache
+from app.llm.intent_router import intent_router
+
+
+async def results_local(items: list[dict], concurrency: int, hotel_id: str | None):
+    """Run the batch in this process, against the configured upstreams."""
+    reload_hotel_snapshot(hotel_id)
+    intent_router.load()
+    await history_cache.start()
+    try:
+        async for result in run_batch(items, concurrency, hotel_id):
+            yield result
+    finally:
+        await conversation_summaries.stop()
+        await history_cache.stop()
+        await aclose_http_clients()
+
+
+async def results_remote(url: str, data: bytes, concurrency: int, hotel_id: str | None):
+    """Run the batch on a server through its /admin/eval endpoint."""
+    params = {"concurrency": concurrency}
+    if hotel_id:
+        params["hotel_id"] = hotel_id
+    headers = {"X-API-Key": os.getenv("ADMIN_API_KEY", ""), "Content-Type": "application/x-ndjson"}
+
+    async with httpx.AsyncClient(base_url=url, timeout=httpx.Timeout(30, read=None)) as client:
+        async with client.stream("POST", "/admin/eval", params=params, headers=headers, content=data) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise RuntimeError(f"Server returned {response.status_code}: {response.text}")
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield orjson.loads(line)
+
+
+async def run(args) -> dict:
+    data = args.input.read_bytes()
+    items = parse_jsonl(data)
+
+    if args.url:
+        results = results_remote(args.url.rstrip("/"), data, args.concurrency, args.hotel)
+    else:
+        results = results_local(items, args.concurrency, args.hotel)
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    collected = []
+    try:
+        async for result in results:
+            collected.append(result)
+            out.write(orjson.dumps(result) + b"\n")
+            out.flush()
+            print(f"[{len(collected)}/{len(items)}] {result['ms']:8.1f} ms  {result['intent']}  "
+                  f"{result['message'][:60]!r}", file=sys.stderr)
+    finally:
+        if args.out:
+            out.close()
+    return summarize(collected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of guest questions and write the results as JSONL")
+    parser.add_argument("input", type=Path, help="JSONL with a message per line (optionally id, intent, hotel_id)")
+    parser.add_argument("--out", type=Path, help="Write results here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY, help="Questions answered at once")
+    parser.add_argument("--hotel", help="Hotel id for items that don't name one")
+    parser.add_argument("--url", help="Run on this server's /admin/eval (uses ADMIN_API_KEY) instead of in-process")
+    args = parser.parse_args()
+
+    try:
+        summary = asyncio.run(run(args))
+    except (EvalInputError, RuntimeError, OSError) as e:
+        print("Error:", e, file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Done: {orjson.dumps(summary).decode('utf-8')}", file=sys.stderr)
+    sys.exit(1 if summary["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
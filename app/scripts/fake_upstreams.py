@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.data_loader import load_hotel_info
+from app.hotel_documents import build_documents
+from app.utils.text_utils import normalize_text
+
+EMBEDDING_DIM = 1536
+FAKE_REPLY = "Gracias por tu pregunta. Según la información del hotel, recepción puede ayudarte con los detalles."
+
+
+class FakeEmbeddings:
+    """Deterministic embedder: hashed bag of words, L2-normalized.
+
+    Texts that share words get similar vectors, so retrieval, the intent
+    router and the answer cache behave like they would with real embeddings.
+    Also usable where a LangChain embeddings object is expected.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, text) -> np.ndarray:
+        if isinstance(text, list):
+            # Pre-tokenized input, as sent when the client checks context length
+            tokens = [str(t) for t in text]
+        else:
+            tokens = re.findall(r"\w+", normalize_text(text))
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokens:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if (digest >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed(t).tolist() for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed(text).tolist()
+
+
+class FakeUpstreams:
+    """PostgREST (chat_messages, match_hotel_knowledge) and OpenAI-compatible
+    (embeddings, chat completions) endpoints with fixed added latency.
+
+    Every upstream call is counted; `GET /__stats` returns the counts.
+    """
+
+    def __init__(self, db_ms: float = 20, embed_ms: float = 50, rpc_ms: float = 30, llm_ms: float = 600):
+        self.latency = {"db": db_ms / 1000, "embed": embed_ms / 1000, "rpc": rpc_ms / 1000, "llm": llm_ms / 1000}
+        self.calls: Counter = Counter()
+        self.embedder = FakeEmbeddings()
+        self.messages: dict[str, list[dict]] = {}
+
+        self.documents = build_documents(load_hotel_info())
+        self.vectors = np.stack([self.embedder.embed(d) for d in self.documents])
+
+        self.app = FastAPI()
+        self.app.get("/rest/v1/chat_messages")(self.select_messages)
+        self.app.post("/rest/v1/chat_messages")(self.insert_messages)
+        self.app.post("/rest/v1/rpc/match_hotel_knowledge")(self.match_documents)
+        self.app.post("/v1/embeddings")(self.embeddings)
+        self.app.post("/v1/chat/completions")(self.chat_completions)
+        self.app.get("/__stats")(self.stats)
+
+    async def _call(self, name: str, kind: str):
+        self.calls[name] += 1
+        await asyncio.sleep(self.latency[kind])
+
+    async def select_messages(self, request: Request):
+        await self._call("history_select", "db")
+        params = request.query_params
+        rows = self.messages.get(params.get("session_id", "").removeprefix("eq."), [])
+
+        after = params.get("created_at", "")
+        if after.startswith("gt."):
+            rows = [r for r in rows if r["created_at"] > after[3:]]
+        if params.get("order", "").endswith(".desc"):
+            rows = rows[::-1]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return [{"sender": r["sender"], "message": r["message"], "created_at": r["created_at"]} for r in rows]
+
+    async def insert_messages(self, request: Request):
+        await self._call("history_insert", "db")
+        body = await request.json()
+        rows = body if isinstance(body, list) else [body]
+        for row in rows:
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            self.messages.setdefault(row["session_id"], []).append(row)
+        return JSONResponse(rows, status_code=201)
+
+    async def match_documents(self, request: Request):
+        await self._call("rpc_match", "rpc")
+        # Only the default hotel's documents are loaded, filter_hotel_id is ignored
+        body = await request.json()
+        query = np.asarray(body["query_embedding"], dtype=np.float32)
+        scores = self.vectors @ query
+        top = np.argsort(-scores)[:int(body.get("match_count", 4))]
+        return [{"content": self.documents[i], "similarity": float(scores[i])} for i in top]
+
+    async def embeddings(self, request: Request):
+        await self._call("embeddings", "embed")
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = self.embedder.embed(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-3-small"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    async def chat_completions(self, request: Request):
+        await self._call("chat_completions", "llm")
+        body = await request.json()
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion_tokens = len(FAKE_REPLY) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model", "")}
+
+        if not body.get("stream"):
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": FAKE_REPLY},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            payload = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+            return f"data: {JSONResponse(payload).body.decode('utf-8')}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for word in FAKE_REPLY.split(" "):
+                yield chunk({"content": word + " "})
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk(None, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def stats(self):
+        return dict(self.calls)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve fake Supabase/OpenAI upstreams for local load testing")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--db-ms", type=float, default=20)
+    parser.add_argument("--embed-ms", type=float, default=50)
+    parser.add_argument("--rpc-ms", type=float, default=30)
+    parser.add_argument("--llm-ms", type=float, default=600)
+    args = parser.parse_args()
+
+    fakes = FakeUpstreams(args.db_ms, args.embed_ms, args.rpc_ms, args.llm_ms)
+    print(f"Point the app at SUPABASE_URL=http://127.0.0.1:{args.port} "
+          f"OPENAI_BASE_URL=http://127.0.0.1:{args.port}/v1")
+    uvicorn.run(fakes.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
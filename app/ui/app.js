@@ -1,6 +1,10 @@
 // Use relative URLs so the UI works on any domain (localhost, Render, etc.)
-const API_URL = '/chat';
-const HOTEL_INFO_URL = '/hotel-info';
+const API_URL = '/chat/stream';
+// Multi-property deployments select the hotel with ?hotel=<id>
+const HOTEL_ID = new URLSearchParams(window.location.search).get('hotel');
+const HOTEL_INFO_URL = HOTEL_ID
+	? `/hotel-info?hotel_id=${encodeURIComponent(HOTEL_ID)}`
+	: '/hotel-info';
 const sessionId = `session-${Date.now()}-${Math.random()
 	.toString(36)
 	.substring(2, 9)}`;
@@ -28,6 +32,7 @@ function addMessage(text, sender) {
 	div.innerText = text;
 	messagesDiv.appendChild(div);
 	scrollToBottom();
+	return div;
 }
 
 function scrollToBottom() {
@@ -75,16 +80,34 @@ async function sendMessage(text = null) {
 			body: JSON.stringify({
 				message,
 				session_id: sessionId,
+				hotel_id: HOTEL_ID,
 			}),
 		});
 
-		if (!res.ok) {
+		if (!res.ok || !res.body) {
 			throw new Error(`Error del servidor: ${res.status}`);
 		}
 
-		const data = await res.json();
-		hideTypingIndicator();
-		addMessage(data.reply, 'bot');
+		let botDiv = null;
+		let botText = '';
+		await readEvents(res.body, (event, data) => {
+			if (event === 'token') {
+				if (!botDiv) {
+					hideTypingIndicator();
+					botDiv = addMessage('', 'bot');
+				}
+				botText += data.text;
+				botDiv.innerText = botText;
+				scrollToBottom();
+			} else if (event === 'message' || event === 'done') {
+				hideTypingIndicator();
+				if (!botDiv) {
+					addMessage(data.reply, 'bot');
+				}
+			} else if (event === 'error') {
+				throw new Error(data.detail);
+			}
+		});
 	} catch (error) {
 		console.error('Error:', error);
 		hideTypingIndicator();
@@ -97,6 +120,33 @@ async function sendMessage(text = null) {
 	}
 }
 
+// Parse a Server-Sent Events body, calling onEvent(event, data) per event
+async function readEvents(body, onEvent) {
+	const reader = body.getReader();
+	const decoder = new TextDecoder();
+	let buffer = '';
+
+	while (true) {
+		const { value, done } = await reader.read();
+		if (done) break;
+		buffer += decoder.decode(value, { stream: true });
+
+		let boundary;
+		while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+			const raw = buffer.slice(0, boundary);
+			buffer = buffer.slice(boundary + 2);
+
+			let event = 'message';
+			let data = '';
+			raw.split('\n').forEach((line) => {
+				if (line.startsWith('event: ')) event = line.slice(7);
+				else if (line.startsWith('data: ')) data += line.slice(6);
+			});
+			if (data) onEvent(event, JSON.parse(data));
+		}
+	}
+}
+
 function sendQuick(text) {
 	if (!isProcessing) {
 		sendMessage(text);
@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.utils.file_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+UI_DIR = Path(__file__).parent / "ui"
+BUILD_DIR = UI_DIR / "build"
+MANIFEST_PATH = BUILD_DIR / "manifest.json"
+
+# index.html last: it is rewritten to point at the hashed names of the others
+ASSETS = ("app.js", "styles.css", "index.html")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hashed_name(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{_digest(data)[:12]}{ext}"
+
+
+def _write(path: Path, data: bytes):
+    atomic_write(path, lambda file: file.write(data))
+
+
+def build_ui_assets(src: Path = UI_DIR, out: Path = BUILD_DIR) -> dict:
+    """Write content-hashed copies of the UI assets, each with gzip and
+    brotli variants, plus a manifest mapping the original names to them.
+
+    Brotli variants are skipped when the brotli package is not installed.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.warning("brotli is not installed, UI assets are only precompressed with gzip")
+
+    out.mkdir(parents=True, exist_ok=True)
+    sources, files = {}, {}
+    for name in ASSETS:
+        data = (src / name).read_bytes()
+        sources[name] = _digest(data)
+        if name == "index.html":
+            for original, hashed in files.items():
+                data = data.replace(f'"{original}"'.encode(), f'"{hashed}"'.encode())
+
+        files[name] = _hashed_name(name, data)
+        target = out / files[name]
+        if target.exists():
+            continue
+        _write(target, data)
+        # mtime=0 keeps the gzip bytes identical across builds
+        _write(target.with_name(target.name + ".gz"), gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(target.with_name(target.name + ".br"), brotli.compress(data, quality=11))
+
+    manifest = {"sources": sources, "files": files}
+    _write(out / MANIFEST_PATH.name, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def load_manifest(src: Path = UI_DIR, out: Path = BUILD_DIR) -> dict | None:
+    """The build manifest, or None if it is missing or the sources changed since."""
+    try:
+        manifest = json.loads((out / MANIFEST_PATH.name).read_text(encoding="utf-8"))
+        current = {name: _digest((src / name).read_bytes()) for name in ASSETS}
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("sources") == current else None
+
+
+def ensure_ui_assets() -> dict | None:
+    """Load the manifest, (re)building the assets if they are stale.
+
+    Returns None when they can't be built, so the UI is served as is.
+    """
+    manifest = load_manifest()
+    if manifest is not None:
+        return manifest
+    try:
+        return build_ui_assets()
+    except OSError as e:
+        logger.warning(f"Failed to build UI assets, serving them uncompressed: {e}")
+        return None
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves the built UI assets precompressed.
+
+    Hashed names get immutable cache headers; the original names (bookmarks,
+    `index.html`) map to the current build and must be revalidated. Anything
+    else in the directory is served as usual.
+    """
+
+    def __init__(self, *, manifest: dict, build_dir: Path = BUILD_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self._build_dir = build_dir
+        self._assets = {}
+        for name, hashed in manifest["files"].items():
+            self._assets[name] = (hashed, name, REVALIDATE)
+            self._assets[hashed] = (hashed, name, IMMUTABLE)
+
+    async def get_response(self, path: str, scope) -> Response:
+        name = os.path.normpath(path)
+        if name == ".":
+            name = "index.html"
+        asset = self._assets.get(name)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        hashed, original, cache_control = asset
+        request_headers = Headers(scope=scope)
+        accepted = request_headers.get("accept-encoding", "")
+        full_path = self._build_dir / hashed
+        encoding = None
+        for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+            variant = full_path.with_name(full_path.name + suffix)
+            if candidate in accepted and variant.exists():
+                full_path, encoding = variant, candidate
+                break
+
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        response = FileResponse(
+            full_path,
+            media_type=mimetypes.guess_type(original)[0] or "application/octet-stream",
+            headers=headers,
+            stat_result=os.stat(full_path),
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,19 @@
+import os
+from pathlib import Path
+from typing import Callable, IO
+
+
+def atomic_write(path: str | Path, write_fn: Callable[[IO], None], mode: str = "wb"):
+    """Write `path` through `write_fn(file)` into a temporary file, then
+    rename it over `path`, so other workers reading or memory-mapping it
+    see either the old file or the complete new one, never a partial write.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, mode, encoding=None if "b" in mode else "utf-8") as file:
+            write_fn(file)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
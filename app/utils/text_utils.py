@@ -0,0 +1,15 @@
+import unicodedata
+
+# Combining tilde is kept so "año" and "ano" stay different words
+_KEEP_MARKS = {"\u0303"}
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, collapse whitespace and strip accents from `text`."""
+    text = " ".join(text.casefold().split())
+    decomposed = unicodedata.normalize("NFD", text)
+    folded = "".join(
+        c for c in decomposed
+        if not unicodedata.combining(c) or c in _KEEP_MARKS
+    )
+    return unicodedata.normalize("NFC", folded)
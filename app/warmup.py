@@ -0,0 +1,74 @@
+import asyncio
+import importlib
+import logging
+import time
+
+from app.core.config.supabase_client import get_supabase, get_async_supabase
+from app.llm.llm_service import get_llm
+from app.llm.prompt_builder import count_tokens
+from app.llm.vector_store import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Creates the heavy clients in the background after the worker starts.
+
+    Everything here is also created lazily on first use, so the worker can
+    serve requests while this runs; it only moves that cost off the first
+    LLM-bound request. A failed step is logged and retried lazily later.
+    """
+
+    STEPS = [
+        ("llm", get_llm),
+        ("embeddings", get_embeddings),
+        ("prompt", lambda: importlib.import_module("langchain.messages")),
+        ("tokenizer", lambda: count_tokens("")),
+        ("supabase", get_supabase),
+    ]
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._started = 0.0
+        self.seconds: float | None = None
+        self.errors: dict[str, str] = {}
+
+    def start(self):
+        if self._task is None:
+            self._started = time.perf_counter()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    async def _run(self):
+        for name, step in self.STEPS:
+            try:
+                await asyncio.to_thread(step)
+            except Exception as e:
+                logger.warning(f"Warm-up step {name} failed: {e}")
+                self.errors[name] = str(e)
+
+        try:
+            await get_async_supabase()
+        except Exception as e:
+            logger.warning(f"Warm-up step async_supabase failed: {e}")
+            self.errors["async_supabase"] = str(e)
+
+        self.seconds = round(time.perf_counter() - self._started, 3)
+        logger.info(f"Warm-up finished in {self.seconds}s")
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "seconds": self.seconds, "errors": self.errors}
+
+
+warmup = WarmUp()
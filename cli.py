@@ -6,17 +6,39 @@ import os
 from pathlib import Path
 
 
-def reindex(dry_run: bool = False):
-    """Re-index hotel data into Supabase."""
+def reindex(dry_run: bool = False, local: bool = False, hotel: str | None = None):
+    """Re-index hotel data into Supabase (or the local vector index)."""
     cmd = [sys.executable, "-m", "app.scripts.embeddings_test"]
     if dry_run:
         cmd.append("--dry-run")
+    if local:
+        cmd.append("--local")
+    if hotel:
+        cmd.extend(["--hotel", hotel])
     
     print(f"Running: {' '.join(cmd)}")
     result = subprocess.run(cmd)
     sys.exit(result.returncode)
 
 
+def evaluate(input_path: str, out: str | None = None, concurrency: int | None = None,
+             hotel: str | None = None, url: str | None = None):
+    """Answer a JSONL file of questions through the chat pipeline."""
+    cmd = [sys.executable, "-m", "app.scripts.eval_chat", input_path]
+    if out:
+        cmd.extend(["--out", out])
+    if concurrency:
+        cmd.extend(["--concurrency", str(concurrency)])
+    if hotel:
+        cmd.extend(["--hotel", hotel])
+    if url:
+        cmd.extend(["--url", url])
+
+    print(f"Running: {' '.join(cmd)}", file=sys.stderr)
+    result = subprocess.run(cmd)
+    sys.exit(result.returncode)
+
+
 def check_env():
     """Check if required environment variables are set."""
     required_vars = [
@@ -58,6 +80,15 @@ def main():
     
     reindex_parser = subparsers.add_parser("reindex", help="Re-index hotel data into Supabase")
     reindex_parser.add_argument("--dry-run", action="store_true", help="Preview documents without indexing")
+    reindex_parser.add_argument("--local", action="store_true", help="Build the local vector index file instead of using Supabase")
+    reindex_parser.add_argument("--hotel", help="Hotel id to re-index (default: DEFAULT_HOTEL_ID)")
+    
+    eval_parser = subparsers.add_parser("eval", help="Answer a JSONL file of questions and write the results as JSONL")
+    eval_parser.add_argument("input", help="JSONL with a message per line (optionally id, intent, hotel_id)")
+    eval_parser.add_argument("--out", help="Write results here instead of stdout")
+    eval_parser.add_argument("--concurrency", type=int, help="Questions answered at once (default: EVAL_CONCURRENCY)")
+    eval_parser.add_argument("--hotel", help="Hotel id for questions that don't name one")
+    eval_parser.add_argument("--url", help="Run on this server's /admin/eval instead of in-process")
     
     subparsers.add_parser("check-env", help="Check if environment variables are set")
     
@@ -66,7 +97,9 @@ def main():
     args = parser.parse_args()
     
     if args.command == "reindex":
-        reindex(dry_run=args.dry_run)
+        reindex(dry_run=args.dry_run, local=args.local, hotel=args.hotel)
+    elif args.command == "eval":
+        evaluate(args.input, out=args.out, concurrency=args.concurrency, hotel=args.hotel, url=args.url)
     elif args.command == "check-env":
         check_env()
     elif args.command == "run-server":